@@ -17,7 +17,6 @@ setup(
     install_requires=[
         "numpy",
         "smg-skeletons",
-        "vg",
         "vicon-dssdk"
     ],
     classifiers=[
@@ -1,4 +1,5 @@
 from .subject_from_source_cache import SubjectFromSourceCache
+from .vicon_frame_format import ViconFrameFormat
 from .vicon_interface import ViconInterface
 
 from .live_vicon_interface import LiveViconInterface
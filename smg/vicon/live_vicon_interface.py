@@ -1,14 +1,21 @@
 import numpy as np
 import socket
 
-from typing import Dict, List, Optional, Tuple
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
 from vicon_dssdk import ViconDataStream
 
 from .vicon_interface import ViconInterface
 
 
 class LiveViconInterface(ViconInterface):
-    """The interface to a live Vicon system."""
+    """
+    The interface to a live Vicon system.
+
+    .. note::
+        The interface should be terminated once it's no longer needed, either explicitly (by calling terminate) or by
+        managing its lifetime with a with statement. It is not terminated automatically when garbage collected.
+    """
 
     # CONSTRUCTOR
 
@@ -20,6 +27,13 @@ class LiveViconInterface(ViconInterface):
         """
         self.__alive: bool = False
 
+        # Caches of the marker names and segment names for each subject. Since the topology of a subject doesn't
+        # change from frame to frame, there's no need to ask the Vicon system for it every time. Note that we don't
+        # keep the parent segments of the markers, since we don't use them. The names are stored as tuples, so that
+        # callers can't modify the cached names via the lists we return.
+        self.__marker_names_cache: Dict[str, Tuple[str, ...]] = {}
+        self.__segment_names_cache: Dict[str, Tuple[str, ...]] = {}
+
         # Construct the Vicon client.
         self.__client: ViconDataStream.Client = ViconDataStream.Client()
 
@@ -58,12 +72,6 @@ class LiveViconInterface(ViconInterface):
 
         self.__alive = True
 
-    # DESTRUCTOR
-
-    def __del__(self):
-        """Destroy the Vicon interface."""
-        self.terminate()
-
     # SPECIAL METHODS
 
     def __enter__(self):
@@ -102,34 +110,94 @@ class LiveViconInterface(ViconInterface):
             print(e)
             return None
 
-    def get_marker_positions(self, subject_name: str) -> Dict[str, np.ndarray]:
+    def get_marker_data(self, subject_name: str) -> Tuple[List[str], np.ndarray, np.ndarray]:
         """
-        Try to get the latest positions of the markers for the subject with the specified name.
+        Try to get the latest positions of all of the markers for the specified subject in one go.
+
+        .. note::
+            The contents of the rows corresponding to markers whose positions are unknown are unspecified.
 
         :param subject_name:    The name of the subject.
-        :return:                The latest positions of the markers for the subject (indexed by name), if possible,
-                                or the empty dictionary otherwise.
+        :return:                A tuple consisting of the names of the markers, an N x 3 array of their positions,
+                                and a boolean array of length N indicating which of the positions are known, if
+                                possible, or an empty list and two empty arrays otherwise.
         """
         try:
-            result: Dict[str, np.ndarray] = {}
+            marker_names: Tuple[str, ...] = self.__get_marker_names(subject_name)
+            positions: np.ndarray = np.empty((len(marker_names), 3), dtype=np.float32)
+            occluded_mask: np.ndarray = np.empty(len(marker_names), dtype=bool)
+
+            # For each marker that the subject has, get its position in the Vicon coordinate system (if known),
+            # together with its occlusion status.
+            for i, marker_name in enumerate(marker_names):
+                positions[i], occluded_mask[i] = self.__client.GetMarkerGlobalTranslation(subject_name, marker_name)
+
+            # Convert all of the positions from mm (Vicon) to metres (ours) in one go. Note that we use single
+            # precision, since the precision of the Vicon system is well within that of a float32. We divide by
+            # 1000 rather than multiplying by 1e-3, since 1e-3 isn't exactly representable as a float32 (so that
+            # e.g. 3000mm would otherwise come out as 3.0000002m rather than 3m).
+            positions /= np.float32(1000)
+
+            # Note: The positions are made read-only, for consistency with the offline interface (which hands out
+            #       views onto the data it stores).
+            positions.setflags(write=False)
+
+            return list(marker_names), positions, ~occluded_mask
+        except ViconDataStream.DataStreamException as e:
+            # If any exceptions are raised, print out what happened, but otherwise suppress them and keep running.
+            print(e)
+            return [], np.empty((0, 3), dtype=np.float32), np.empty(0, dtype=bool)
+
+    def get_marker_positions(self, subject_name: str) -> Mapping[str, np.ndarray]:
+        """
+        Try to get the latest positions of the markers for the subject with the specified name.
+
+        .. note::
+            The mapping returned, and the position arrays it contains, are read-only.
 
-            # For each marker that the subject has:
-            for marker_name, parent_segment in self.__client.GetMarkerNames(subject_name):
-                # Get its position in the Vicon coordinate system (if known), together with its occlusion status.
-                trans, occluded = self.__client.GetMarkerGlobalTranslation(subject_name, marker_name)
+        :param subject_name:    The name of the subject.
+        :return:                The latest positions of the markers for the subject (indexed by name), if possible,
+                                or an empty mapping otherwise.
+        """
+        # Record the positions of the markers that aren't occluded in the dictionary. Note that each position is
+        # a (read-only) view onto a row of the array of positions, so no further copying is needed.
+        marker_names, positions, known = self.get_marker_data(subject_name)
+        return MappingProxyType({marker_name: positions[i] for i, marker_name in enumerate(marker_names) if known[i]})
 
-                # If we can't currently get the position of the marker, skip it.
-                if occluded:
-                    continue
+    def get_segment_data(self, subject_name: str) -> Tuple[List[str], np.ndarray, np.ndarray]:
+        """
+        Try to get the current global 6D poses and local rotation matrices of all of the segments for the specified
+        subject in one go.
 
-                # Record the position in the dictionary.
-                result[marker_name] = LiveViconInterface.__from_vicon_position(trans)
+        .. note::
+            The rows corresponding to any unknown poses or rotations are filled with NaNs.
 
-            return result
+        :param subject_name:    The name of the subject.
+        :return:                A tuple consisting of the names of the subject's segments, an M x 4 x 4 array of
+                                their global 6D poses, and an M x 3 x 3 array of their local rotation matrices, if
+                                possible, or an empty list and two empty arrays otherwise.
+        """
+        try:
+            segment_names: List[str] = self.get_segment_names(subject_name)
+            global_poses: np.ndarray = np.full((len(segment_names), 4, 4), np.nan, dtype=np.float32)
+            local_rotations: np.ndarray = np.full((len(segment_names), 3, 3), np.nan, dtype=np.float32)
+
+            # For each segment, write its pose and local rotation (if known) directly into the output arrays.
+            for i, segment_name in enumerate(segment_names):
+                trans, trans_occluded = self.__client.GetSegmentGlobalTranslation(subject_name, segment_name)
+                rot, rot_occluded = self.__client.GetSegmentGlobalRotationMatrix(subject_name, segment_name)
+                if not trans_occluded and not rot_occluded:
+                    LiveViconInterface.__make_camera_from_world(rot, trans, global_poses[i])
+
+                rot, rot_occluded = self.__client.GetSegmentLocalRotationMatrix(subject_name, segment_name)
+                if not rot_occluded:
+                    local_rotations[i] = rot
+
+            return segment_names, global_poses, local_rotations
         except ViconDataStream.DataStreamException as e:
             # If any exceptions are raised, print out what happened, but otherwise suppress them and keep running.
             print(e)
-            return {}
+            return [], np.empty((0, 4, 4), dtype=np.float32), np.empty((0, 3, 3), dtype=np.float32)
 
     def get_segment_global_pose(self, subject_name: str, segment_name: str) -> Optional[np.ndarray]:
         """
@@ -140,21 +208,46 @@ class LiveViconInterface(ViconInterface):
         :return:                The current global 6D pose of the segment, if possible, or None otherwise.
         """
         try:
-            world_from_camera: np.ndarray = np.eye(4)
+            trans, occluded = self.__client.GetSegmentGlobalTranslation(subject_name, segment_name)
+            if occluded:
+                return None
+
+            rot, occluded = self.__client.GetSegmentGlobalRotationMatrix(subject_name, segment_name)
+            if occluded:
+                return None
+
+            camera_from_world: np.ndarray = np.empty((4, 4), dtype=np.float32)
+            LiveViconInterface.__make_camera_from_world(rot, trans, camera_from_world)
+            return camera_from_world
+        except ViconDataStream.DataStreamException as e:
+            # If any exceptions are raised, print out what happened, but otherwise suppress them and keep running.
+            print(e)
+            return None
 
+    def get_segment_global_pose_inverse(self, subject_name: str, segment_name: str) -> Optional[np.ndarray]:
+        """
+        Try to get the inverse of the current global 6D pose of the specified segment for the specified subject.
+
+        .. note::
+            The Vicon system provides the segment-to-world transformation directly, so no inversion is needed.
+
+        :param subject_name:    The name of the subject.
+        :param segment_name:    The name of the segment.
+        :return:                The inverse of the current global 6D pose of the segment, if possible, or None
+                                otherwise.
+        """
+        try:
             trans, occluded = self.__client.GetSegmentGlobalTranslation(subject_name, segment_name)
             if occluded:
                 return None
-            else:
-                world_from_camera[0:3, 3] = LiveViconInterface.__from_vicon_position(trans)
 
             rot, occluded = self.__client.GetSegmentGlobalRotationMatrix(subject_name, segment_name)
             if occluded:
                 return None
-            else:
-                world_from_camera[0:3, 0:3] = rot
 
-            return np.linalg.inv(world_from_camera)
+            world_from_segment: np.ndarray = np.empty((4, 4), dtype=np.float32)
+            LiveViconInterface.__make_world_from_camera(rot, trans, world_from_segment)
+            return world_from_segment
         except ViconDataStream.DataStreamException as e:
             # If any exceptions are raised, print out what happened, but otherwise suppress them and keep running.
             print(e)
@@ -170,7 +263,7 @@ class LiveViconInterface(ViconInterface):
         """
         try:
             rot, occluded = self.__client.GetSegmentLocalRotationMatrix(subject_name, segment_name)
-            return np.array(rot) if not occluded else None
+            return np.array(rot, dtype=np.float32) if not occluded else None
         except ViconDataStream.DataStreamException as e:
             # If any exceptions are raised, print out what happened, but otherwise suppress them and keep running.
             print(e)
@@ -185,7 +278,15 @@ class LiveViconInterface(ViconInterface):
                                 empty list otherwise.
         """
         try:
-            return self.__client.GetSegmentNames(subject_name)
+            segment_names: Optional[Tuple[str, ...]] = self.__segment_names_cache.get(subject_name)
+            if segment_names is None:
+                segment_names = tuple(self.__client.GetSegmentNames(subject_name))
+
+                # Note: As with the marker names, an empty list of segment names is not cached.
+                if len(segment_names) > 0:
+                    self.__segment_names_cache[subject_name] = segment_names
+
+            return list(segment_names)
         except ViconDataStream.DataStreamException as e:
             # If any exceptions are raised, print out what happened, but otherwise suppress them and keep running.
             print(e)
@@ -205,6 +306,16 @@ class LiveViconInterface(ViconInterface):
             print(e)
             return []
 
+    def refresh_topology(self) -> None:
+        """
+        Clear any cached information about the topology (marker and segment names) of the subjects.
+
+        .. note::
+            This only needs to be called if the subjects are redefined in the Vicon software mid-capture.
+        """
+        self.__marker_names_cache.clear()
+        self.__segment_names_cache.clear()
+
     def terminate(self) -> None:
         """Destroy the Vicon interface."""
         if self.__alive:
@@ -214,17 +325,61 @@ class LiveViconInterface(ViconInterface):
             self.__client.Disconnect()
             self.__alive = False
 
+    # PRIVATE METHODS
+
+    def __get_marker_names(self, subject_name: str) -> Tuple[str, ...]:
+        """
+        Get the names of the markers for the specified subject, using the cache if possible.
+
+        .. note::
+            An empty list of marker names is not cached, since it may simply mean that the subject hasn't appeared
+            in the data stream yet.
+        .. note::
+            This may raise a ViconDataStream.DataStreamException.
+
+        :param subject_name:    The name of the subject.
+        :return:                The names of the markers for the subject.
+        """
+        marker_names: Optional[Tuple[str, ...]] = self.__marker_names_cache.get(subject_name)
+        if marker_names is None:
+            # Note: The Vicon system returns (marker name, parent segment) pairs, so we strip off the parent segments.
+            marker_names = tuple(marker_name for marker_name, _ in self.__client.GetMarkerNames(subject_name))
+            if len(marker_names) > 0:
+                self.__marker_names_cache[subject_name] = marker_names
+
+        return marker_names
+
     # PRIVATE STATIC METHODS
 
     @staticmethod
-    def __from_vicon_position(pos) -> np.ndarray:
+    def __make_camera_from_world(rot: Sequence[Sequence[float]], trans: Sequence[float], out: np.ndarray) -> None:
         """
-        Transform a position from the Vicon coordinate system to our one.
+        Make a camera-from-world transformation from a world-from-camera rotation and translation (in mm) obtained
+        from the Vicon system.
 
         .. note::
-            The Vicon coordinate system is in mm, whereas ours is in metres.
+            The world-from-camera transformation is rigid, so it is inverted using ViconInterface.invert_rigid_transform
+            rather than np.linalg.inv.
+
+        :param rot:     The world-from-camera rotation matrix (as returned by the Vicon system).
+        :param trans:   The world-from-camera translation, in mm (as returned by the Vicon system).
+        :param out:     The 4x4 matrix into which to write the camera-from-world transformation.
+        """
+        world_from_camera: np.ndarray = np.empty((4, 4), dtype=out.dtype)
+        LiveViconInterface.__make_world_from_camera(rot, trans, world_from_camera)
+        ViconInterface.invert_rigid_transform(world_from_camera, out=out)
+
+    @staticmethod
+    def __make_world_from_camera(rot: Sequence[Sequence[float]], trans: Sequence[float], out: np.ndarray) -> None:
+        """
+        Make a world-from-camera transformation from a rotation and translation (in mm) obtained from the Vicon system.
 
-        :param pos: The position in the Vicon coordinate system.
-        :return:    The equivalent position in our coordinate system.
+        :param rot:     The world-from-camera rotation matrix (as returned by the Vicon system).
+        :param trans:   The world-from-camera translation, in mm (as returned by the Vicon system).
+        :param out:     The 4x4 matrix into which to write the world-from-camera transformation.
         """
-        return np.array(pos) / 1000
+        # Convert the translation from mm (Vicon) to metres (ours) as we write it into the output matrix.
+        out[0:3, 0:3] = rot
+        out[0:3, 3] = trans
+        out[0:3, 3] /= np.float32(1000)
+        out[3] = (0, 0, 0, 1)
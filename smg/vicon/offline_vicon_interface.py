@@ -1,28 +1,186 @@
+import io
 import numpy as np
 import os
+import queue
+import re
+import threading
+import weakref
 
-from typing import Dict, List, Optional
+from collections.abc import Mapping
+from types import MappingProxyType
+from typing import Dict, Iterator, List, Optional, Set, Tuple, Union
 
+from .vicon_frame_format import ViconFrameFormat
 from .vicon_interface import ViconInterface
 
 
+# A regular expression matching a single "'name': array([...])" or "'name': None" entry in the repr of a dictionary.
+_ARRAY_ENTRY_RE: re.Pattern = re.compile(r"'([^']*)': (?:array\(\[([^\]]*)\](?:, dtype=\w+)?\)|None)")
+
+# A regular expression matching the block of lines for a single subject in a text frame file. Each line has the form
+# "specifier: contents", and we capture the contents of each line (the contents of some of the lines themselves
+# contain ": ", which is why we match up to the first occurrence of it). The fourth line (the local rotations) is
+# optional, since the older version of the file format didn't save them.
+_SUBJECT_BLOCK_RE: re.Pattern = re.compile(
+    r"[^\n]*?: ([^\n]*)\n[^\n]*?: ([^\n]*)\n[^\n]*?: ([^\n]*)(?:\n(?!\n)[^\n]*?: ([^\n]*))?(?:\n|$)"
+)
+
+
 class OfflineViconInterface(ViconInterface):
     """
     The interface to an offline Vicon system.
 
     An offline Vicon system simulates a live Vicon system by using saved state that was originally captured live.
+
+    .. note::
+        As with the live interface, the lifetime of the interface can be managed by a with statement, although in
+        practice no cleanup is needed.
     """
 
     # NESTED TYPES
 
+    class ArrayMapping(Mapping):
+        """
+        A read-only mapping from names to the rows of a single contiguous array.
+
+        .. note::
+            Storing the values for all of the names in one array (rather than storing a separate small array for
+            each name) avoids a large number of small allocations when loading a frame.
+        """
+
+        # Note: Several of these objects are created per subject for every frame that's decoded, so we use slots to
+        #       avoid giving each of them its own instance dictionary.
+        __slots__ = ("__array", "__known", "__name_to_row", "__names")
+
+        # CONSTRUCTOR
+
+        def __init__(self, names: List[str], array: np.ndarray, known: Optional[np.ndarray] = None, *,
+                     name_to_row: Optional[Dict[str, int]] = None):
+            """
+            Construct an array mapping.
+
+            .. note::
+                Mappings that have the same names (e.g. the global poses and local rotations of a subject's segments)
+                can share a single name -> row index, rather than each building their own.
+
+            :param names:       The names, in the order of the corresponding rows of the array.
+            :param array:       An array whose i'th row contains the value for the i'th name.
+            :param known:       An optional boolean array indicating which of the values are known (the mapping maps
+                                the names of any unknown values to None). If None, all of the values are treated as
+                                known.
+            :param name_to_row: An optional existing index from the names to their rows. If None, an index is built.
+            """
+            self.__names: List[str] = names
+            self.__array: np.ndarray = array
+            self.__known: np.ndarray = known if known is not None else np.ones(len(names), dtype=bool)
+            self.__name_to_row: Dict[str, int] = \
+                name_to_row if name_to_row is not None else {name: i for i, name in enumerate(names)}
+
+        # SPECIAL METHODS
+
+        def __getitem__(self, name: str) -> Optional[np.ndarray]:
+            """
+            Get the value for the specified name.
+
+            :param name:        The name.
+            :return:            The value for the name, if known, or None otherwise.
+            :raises KeyError:   If the name is not in the mapping.
+            """
+            row: int = self.__name_to_row[name]
+            return self.__array[row] if self.__known[row] else None
+
+        def __iter__(self) -> Iterator[str]:
+            """
+            Get an iterator over the names in the mapping.
+
+            :return:    An iterator over the names in the mapping.
+            """
+            return iter(self.__names)
+
+        def __len__(self) -> int:
+            """
+            Get the number of names in the mapping.
+
+            :return:    The number of names in the mapping.
+            """
+            return len(self.__names)
+
+        # PUBLIC STATIC METHODS
+
+        @staticmethod
+        def from_dict(d: Mapping[str, Optional[np.ndarray]], shape: Tuple[int, ...]) \
+                -> "OfflineViconInterface.ArrayMapping":
+            """
+            Make an array mapping from a mapping that maps names to arrays of the specified shape (or None).
+
+            :param d:       The mapping.
+            :param shape:   The shape of each of the (non-None) arrays in the mapping.
+            :return:        The array mapping.
+            """
+            values: np.ndarray = np.zeros((len(d),) + shape, dtype=np.float32)
+            known: np.ndarray = np.zeros(len(d), dtype=bool)
+            for i, value in enumerate(d.values()):
+                if value is not None:
+                    values[i] = value.reshape(shape)
+                    known[i] = True
+
+            return OfflineViconInterface.ArrayMapping(list(d.keys()), values, known)
+
+        # PROPERTIES
+
+        @property
+        def array(self) -> np.ndarray:
+            """
+            Get the array whose i'th row contains the value for the i'th name.
+
+            .. note::
+                This is named so as not to shadow Mapping.values, which returns a view onto the mapping's values
+                (with None for the unknown ones).
+            .. note::
+                The rows corresponding to unknown values have unspecified contents.
+
+            :return:    The array whose i'th row contains the value for the i'th name.
+            """
+            return self.__array
+
+        @property
+        def known(self) -> np.ndarray:
+            """
+            Get the boolean array indicating which of the values are known.
+
+            :return:    The boolean array indicating which of the values are known.
+            """
+            return self.__known
+
+        @property
+        def name_to_row(self) -> Dict[str, int]:
+            """
+            Get the index from the names to their rows in the array.
+
+            :return:    The index from the names to their rows in the array.
+            """
+            return self.__name_to_row
+
+        @property
+        def names(self) -> List[str]:
+            """
+            Get the names, in the order of the corresponding rows of the array.
+
+            :return:    The names, in the order of the corresponding rows of the array.
+            """
+            return self.__names
+
     class Subject:
         """The offline Vicon system's representation of a Vicon subject."""
 
+        # Note: As with the array mappings, one of these is created per subject per decoded frame, so we use slots.
+        __slots__ = ("__marker_positions", "__segment_global_poses", "__segment_local_rotations")
+
         # CONSTRUCTOR
 
-        def __init__(self, marker_positions: Dict[str, np.ndarray],
-                     segment_global_poses: Dict[str, Optional[np.ndarray]],
-                     segment_local_rotations: Dict[str, Optional[np.ndarray]]):
+        def __init__(self, marker_positions: "OfflineViconInterface.ArrayMapping",
+                     segment_global_poses: "OfflineViconInterface.ArrayMapping",
+                     segment_local_rotations: "OfflineViconInterface.ArrayMapping"):
             """
             Construct a Vicon subject.
 
@@ -30,14 +188,14 @@ class OfflineViconInterface(ViconInterface):
             :param segment_global_poses:    The global 6D poses of the subject's segments (if known).
             :param segment_local_rotations: The local rotation matrices of the subject's segments (if known).
             """
-            self.__marker_positions: Dict[str, np.ndarray] = marker_positions
-            self.__segment_global_poses: Dict[str, Optional[np.ndarray]] = segment_global_poses
-            self.__segment_local_rotations: Dict[str, Optional[np.ndarray]] = segment_local_rotations
+            self.__marker_positions: OfflineViconInterface.ArrayMapping = marker_positions
+            self.__segment_global_poses: OfflineViconInterface.ArrayMapping = segment_global_poses
+            self.__segment_local_rotations: OfflineViconInterface.ArrayMapping = segment_local_rotations
 
         # PROPERTIES
 
         @property
-        def marker_positions(self) -> Dict[str, np.ndarray]:
+        def marker_positions(self) -> "OfflineViconInterface.ArrayMapping":
             """
             Get the positions of the subject's markers.
 
@@ -46,12 +204,12 @@ class OfflineViconInterface(ViconInterface):
             return self.__marker_positions
 
         @property
-        def segment_global_poses(self) -> Dict[str, Optional[np.ndarray]]:
+        def segment_global_poses(self) -> "OfflineViconInterface.ArrayMapping":
             """
             Get the global 6D poses of the subject's segments (if known).
 
             .. note::
-                Some or all of these can be None if they're unknown. However, the dictionary will in any case
+                Some or all of these can be None if they're unknown. However, the mapping will in any case
                 contain an entry for each segment the subject has.
 
             :return:    The global 6D poses of the subject's segments.
@@ -59,12 +217,12 @@ class OfflineViconInterface(ViconInterface):
             return self.__segment_global_poses
 
         @property
-        def segment_local_rotations(self) -> Dict[str, Optional[np.ndarray]]:
+        def segment_local_rotations(self) -> "OfflineViconInterface.ArrayMapping":
             """
             Get the local rotation matrices of the subject's segments (if known).
 
             .. note::
-                Some or all of these can be None if they're unknown. However, the dictionary will in any case
+                Some or all of these can be None if they're unknown. However, the mapping will in any case
                 contain an entry for each segment the subject has.
 
             :return:    The local rotation matrices of the subject's segments.
@@ -73,41 +231,93 @@ class OfflineViconInterface(ViconInterface):
 
     # CONSTRUCTOR
 
-    def __init__(self, *, folder: str, use_partial_frames: bool = False):
+    def __init__(self, *, folder: str, use_partial_frames: bool = False, prefetch_frames: int = 0,
+                 cache_binary_frames: bool = False):
         """
         Construct an offline Vicon system.
 
+        .. note::
+            If binary caching is enabled, any frame in the folder that has only been saved in text format (or whose
+            text file is newer than its binary file) is parsed when the interface is constructed, and saved alongside
+            the text file in binary format (see ViconFrameFormat.BINARY), so that later runs can avoid parsing it.
+            This means that the folder will be written to. If it can't be written to, the text files are used.
+        .. note::
+            If prefetching is enabled, the frames are decoded in order on a background thread, so that get_frame can
+            simply pick up the next decoded frame. In that case, the interface should be terminated (e.g. by managing
+            its lifetime with a with statement) when it's no longer needed, so that the background thread is stopped
+            straight away. (If it isn't, the thread is stopped once the interface has been garbage collected.) Once
+            it has been terminated, get_frame will return False.
+
         :param folder:              A folder on disk that contains saved state from a live Vicon system.
         :param use_partial_frames:  Whether to use the Vicon frames for which no corresponding image is available.
+        :param prefetch_frames:     The maximum number of frames to decode in advance on a background thread (0 means
+                                    that frames are decoded lazily on the calling thread instead).
+        :param cache_binary_frames: Whether to save a binary version of any frame that has only been saved in text
+                                    format (or whose binary version is out of date) into the folder.
         """
         self.__folder: str = folder
 
-        # The names of the relevant files in the folder that contain saved Vicon frame data, in frame number order.
-        frame_filenames: List[str] = [
-            f.replace(".color.png", ".vicon.txt") for f in os.listdir(self.__folder) if f.endswith(".color.png")
-        ]
-
-        if use_partial_frames or len(frame_filenames) == 0:
-            frame_filenames = [f for f in os.listdir(self.__folder) if f.endswith(".vicon.txt")]
-
-        self.__frame_filenames: List[str] = sorted(
-            frame_filenames, key=OfflineViconInterface.__get_frame_number
-        )
+        # Note: The files containing saved Vicon frame data are named <frame number>.vicon.txt or
+        #       <frame number>.vicon.npz (depending on the format), so we can get the frame numbers directly from the
+        #       file names. We parse each frame number once up-front, rather than on each comparison during the sort.
+        #       We also make a single pass over the folder, collecting the numbers of the frames for which images are
+        #       available at the same time as those of the frames for which Vicon data is available.
+        image_frame_numbers: Set[int] = set()
+        vicon_frame_numbers: Set[int] = set()
+        with os.scandir(self.__folder) as it:
+            for entry in it:
+                name: str = entry.name
+                if name.endswith(".color.png"):
+                    image_frame_numbers.add(int(name.partition(".")[0]))
+                elif name.endswith(ViconFrameFormat.TEXT.value) or name.endswith(ViconFrameFormat.BINARY.value):
+                    vicon_frame_numbers.add(int(name.partition(".")[0]))
+
+        frame_numbers: Set[int] = image_frame_numbers
+        if use_partial_frames or len(frame_numbers) == 0:
+            frame_numbers = vicon_frame_numbers
+
+        # The numbers originally assigned to the relevant frames by the live Vicon system, in order.
+        self.__frame_numbers: List[int] = sorted(frame_numbers)
+
+        # If requested, make sure that an up-to-date binary version of each frame is available (this avoids the need
+        # to repeatedly parse any frames that were saved in text format, which is slow).
+        if cache_binary_frames:
+            OfflineViconInterface.__ensure_binary_cache(self.__folder, self.__frame_numbers)
 
         # The number originally assigned to the current frame by the live Vicon system.
         self.__frame_number: Optional[int] = None
 
-        # The index in the frame filenames array of the next frame to load.
+        # The index in the frame numbers array of the next frame to load.
         self.__next_frame_idx: int = 0
 
-        # The Vicon subjects present in the current frame.
-        self.__subjects: Dict[str, OfflineViconInterface.Subject] = {}
+        # The index in the frame numbers array of the current frame (if any).
+        self.__current_frame_idx: Optional[int] = None
 
-    # DESTRUCTOR
+        # The Vicon subjects present in the current frame, once it has been decoded. Frames are only decoded when
+        # their contents are actually needed (unless they're being prefetched).
+        self.__current_subjects: Optional[Dict[str, OfflineViconInterface.Subject]] = None
 
-    def __del__(self):
-        """Destroy the Vicon interface."""
-        self.terminate()
+        # The exception (if any) that was raised when the current frame was decoded on the background thread.
+        self.__current_decode_error: Optional[Exception] = None
+
+        # If requested, start a background thread to decode the frames in advance. The decoded frames (or any
+        # exception raised whilst decoding them) are passed back to get_frame via a bounded queue.
+        self.__prefetch_queue: Optional[queue.Queue] = None
+        self.__prefetch_stop: threading.Event = threading.Event()
+        self.__prefetch_thread: Optional[threading.Thread] = None
+
+        if prefetch_frames > 0:
+            self.__prefetch_queue = queue.Queue(maxsize=prefetch_frames)
+            self.__prefetch_thread = threading.Thread(
+                target=OfflineViconInterface.__prefetch_frames,
+                args=(self.__folder, self.__frame_numbers, self.__prefetch_queue, self.__prefetch_stop),
+                daemon=True
+            )
+            self.__prefetch_thread.start()
+
+            # The thread doesn't refer to the interface itself, so if the interface is garbage collected without
+            # having been terminated, we can still tell the thread to stop.
+            weakref.finalize(self, self.__prefetch_stop.set)
 
     # SPECIAL METHODS
 
@@ -126,62 +336,49 @@ class OfflineViconInterface(ViconInterface):
         Try to get the latest frame of data from the system.
 
         .. note::
-            For the offline Vicon system, this means loading the next frame from disk.
+            For the offline Vicon system, this means moving on to the next frame from disk. The frame is decoded
+            lazily, the first time any of its contents are requested (or in advance, if prefetching is enabled). If
+            the frame can't be read or decoded, the exception is raised when its contents are requested.
 
         :return:    True, if the latest frame of data was successfully obtained, or False otherwise.
         """
-        # Clear the existing dictionary of subjects ready for the new frame (if any).
-        self.__subjects = {}
+        # If the frames are being prefetched, pick up the next frame (which is the next one in the queue, since the
+        # frames are decoded in order) from the background thread. If prefetching has stopped (e.g. because the
+        # interface has been terminated), there are no more frames to be had.
+        result: Union[Dict[str, OfflineViconInterface.Subject], Exception, None] = None
+        if self.__prefetch_queue is not None and self.__next_frame_idx < len(self.__frame_numbers):
+            prefetched: Optional[Tuple[int, Union[Dict[str, OfflineViconInterface.Subject], Exception]]] = \
+                self.__get_prefetched_frame()
+            if prefetched is not None:
+                _, result = prefetched
+            else:
+                self.__next_frame_idx = len(self.__frame_numbers)
 
         # If there are still frames on disk that we haven't looked at:
-        if self.__next_frame_idx < len(self.__frame_filenames):
-            # Get the name of the next frame in the sequence.
-            frame_filename: str = self.__frame_filenames[self.__next_frame_idx]
-
-            # Get the number of the new frame from the filename.
-            self.__frame_number = int(frame_filename[:-len(".vicon.txt")])
-
-            # Load the new frame.
-            with open(os.path.join(self.__folder, frame_filename)) as f:
-                lines: List[str] = f.readlines()
-
-                # Note: The new version of the file format uses four content lines and one blank line per subject,
-                #       hence the "5" here. There's also an older version of the file format that didn't save the
-                #       local rotations and so has one fewer content line per subject - we handle that below.
-                for i in range(0, len(lines), 5):
-                    subject_name: str = OfflineViconInterface.__get_line_contents(lines[i])
-                    marker_positions: Dict[str, np.ndarray] = eval(
-                        OfflineViconInterface.__get_line_contents(lines[i+1]), {'array': np.array}
-                    )
-                    segment_global_poses: Dict[str, Optional[np.ndarray]] = eval(
-                        OfflineViconInterface.__get_line_contents(lines[i+2]),
-                        {'array': OfflineViconInterface.__make_pose_matrix}
-                    )
-
-                    # If the file contains four content lines for this subject, read in its local rotations.
-                    if lines[i+3] != "\n":
-                        segment_local_rotations: Dict[str, Optional[np.ndarray]] = eval(
-                            OfflineViconInterface.__get_line_contents(lines[i+3]),
-                            {'array': OfflineViconInterface.__make_rotation_matrix}
-                        )
-
-                    # Otherwise, use an empty map of local rotations, and decrement the line counter to compensate
-                    # for the fact that this subject only has three content lines. Yes, this is a nasty hack :)
-                    else:
-                        segment_local_rotations: Dict[str, Optional[np.ndarray]] = {}
-                        i -= 1
-
-                    self.__subjects[subject_name] = OfflineViconInterface.Subject(
-                        marker_positions, segment_global_poses, segment_local_rotations
-                    )
-
-            # Advance the frame index.
+        if self.__next_frame_idx < len(self.__frame_numbers):
+            # Look up the number of the new frame.
+            self.__frame_number = self.__frame_numbers[self.__next_frame_idx]
+
+            # Make the new frame the current one, and advance the frame index.
+            self.__current_frame_idx = self.__next_frame_idx
+            self.__current_decode_error = None
+            self.__current_subjects = None
             self.__next_frame_idx += 1
 
+            # If the new frame was prefetched, record its subjects (or the exception raised whilst decoding it, which
+            # will be raised when its contents are requested, just as it would be if the frame were decoded lazily).
+            if isinstance(result, Exception):
+                self.__current_decode_error = result
+            elif result is not None:
+                self.__current_subjects = result
+
             return True
 
-        # Otherwise, clear the frame number and signal to the caller that there are no more frames.
+        # Otherwise, clear the current frame and signal to the caller that there are no more frames.
         else:
+            self.__current_decode_error = None
+            self.__current_frame_idx = None
+            self.__current_subjects = None
             self.__frame_number = None
             return False
 
@@ -193,16 +390,76 @@ class OfflineViconInterface(ViconInterface):
         """
         return self.__frame_number
 
-    def get_marker_positions(self, subject_name: str) -> Dict[str, np.ndarray]:
+    def get_marker_data(self, subject_name: str) -> Tuple[List[str], np.ndarray, np.ndarray]:
+        """
+        Try to get the latest positions of all of the markers for the specified subject in one go.
+
+        .. note::
+            The contents of the rows corresponding to markers whose positions are unknown are unspecified.
+        .. note::
+            The arrays returned are those stored for the current frame, so they are read-only.
+
+        :param subject_name:    The name of the subject.
+        :return:                A tuple consisting of the names of the markers, an N x 3 array of their positions,
+                                and a boolean array of length N indicating which of the positions are known.
+        """
+        subject: Optional[OfflineViconInterface.Subject] = self.__get_subjects().get(subject_name)
+        if subject is None:
+            return [], np.empty((0, 3), dtype=np.float32), np.empty(0, dtype=bool)
+
+        marker_positions: OfflineViconInterface.ArrayMapping = subject.marker_positions
+        return list(marker_positions.names), marker_positions.array, marker_positions.known
+
+    def get_marker_positions(self, subject_name: str) -> Mapping[str, np.ndarray]:
         """
         Try to get the latest positions of the markers for the subject with the specified name.
 
+        .. note::
+            The mapping returned is a read-only view onto the stored positions for the current frame (which are
+            themselves read-only), so no copying is needed. The positions of unknown markers are None.
+
         :param subject_name:    The name of the subject.
         :return:                The latest positions of the markers for the subject (indexed by name), if possible,
-                                or the empty dictionary otherwise.
+                                or an empty mapping otherwise.
+        """
+        subject: Optional[OfflineViconInterface.Subject] = self.__get_subjects().get(subject_name)
+        return MappingProxyType(subject.marker_positions if subject is not None else {})
+
+    def get_segment_data(self, subject_name: str) -> Tuple[List[str], np.ndarray, np.ndarray]:
+        """
+        Try to get the current global 6D poses and local rotation matrices of all of the segments for the specified
+        subject in one go.
+
+        .. note::
+            The rows corresponding to any unknown poses or rotations are filled with NaNs.
+
+        :param subject_name:    The name of the subject.
+        :return:                A tuple consisting of the names of the subject's segments, an M x 4 x 4 array of
+                                their global 6D poses, and an M x 3 x 3 array of their local rotation matrices.
         """
-        subject: Optional[OfflineViconInterface.Subject] = self.__subjects.get(subject_name)
-        return subject.marker_positions if subject is not None else {}
+        subject: Optional[OfflineViconInterface.Subject] = self.__get_subjects().get(subject_name)
+        if subject is None:
+            return [], np.empty((0, 4, 4), dtype=np.float32), np.empty((0, 3, 3), dtype=np.float32)
+
+        # Copy the stored global poses straight across, marking the unknown ones with NaNs.
+        global_mapping: OfflineViconInterface.ArrayMapping = subject.segment_global_poses
+        global_poses: np.ndarray = global_mapping.array.copy()
+        global_poses[~global_mapping.known] = np.nan
+
+        # If the local rotations were stored for the same segments (the usual case), do likewise for those.
+        # Otherwise (e.g. for frames saved in the old format, which had no local rotations), look them up by name.
+        local_mapping: OfflineViconInterface.ArrayMapping = subject.segment_local_rotations
+        if local_mapping.names == global_mapping.names:
+            local_rotations: np.ndarray = local_mapping.array.copy()
+            local_rotations[~local_mapping.known] = np.nan
+        else:
+            local_rotations: np.ndarray = np.full((len(global_mapping), 3, 3), np.nan, dtype=np.float32)
+            for i, segment_name in enumerate(global_mapping.names):
+                local_rotation: Optional[np.ndarray] = local_mapping.get(segment_name)
+                if local_rotation is not None:
+                    local_rotations[i] = local_rotation
+
+        return list(global_mapping.names), global_poses, local_rotations
 
     def get_segment_global_pose(self, subject_name: str, segment_name: str) -> Optional[np.ndarray]:
         """
@@ -212,7 +469,7 @@ class OfflineViconInterface(ViconInterface):
         :param segment_name:    The name of the segment.
         :return:                The current global 6D pose of the segment, if possible, or None otherwise.
         """
-        subject: Optional[OfflineViconInterface.Subject] = self.__subjects.get(subject_name)
+        subject: Optional[OfflineViconInterface.Subject] = self.__get_subjects().get(subject_name)
         return subject.segment_global_poses.get(segment_name) if subject is not None else None
 
     def get_segment_local_rotation(self, subject_name: str, segment_name: str) -> Optional[np.ndarray]:
@@ -223,7 +480,7 @@ class OfflineViconInterface(ViconInterface):
         :param segment_name:    The name of the segment.
         :return:                The current local rotation matrix of the segment, if possible, or None otherwise.
         """
-        subject: Optional[OfflineViconInterface.Subject] = self.__subjects.get(subject_name)
+        subject: Optional[OfflineViconInterface.Subject] = self.__get_subjects().get(subject_name)
         return subject.segment_local_rotations.get(segment_name) if subject is not None else None
 
     def get_segment_names(self, subject_name: str) -> List[str]:
@@ -234,7 +491,7 @@ class OfflineViconInterface(ViconInterface):
         :return:                The names of all of the segments for the specified subject, if possible, or the
                                 empty list otherwise.
         """
-        subject: Optional[OfflineViconInterface.Subject] = self.__subjects.get(subject_name)
+        subject: Optional[OfflineViconInterface.Subject] = self.__get_subjects().get(subject_name)
         return list(subject.segment_global_poses.keys()) if subject is not None else None
 
     def get_subject_names(self) -> List[str]:
@@ -244,65 +501,352 @@ class OfflineViconInterface(ViconInterface):
         :return:    The names of all of the subjects that are present in the data stream from the system, if possible,
                     or the empty list otherwise.
         """
-        return list(self.__subjects.keys())
+        return list(self.__get_subjects().keys())
 
     def terminate(self) -> None:
         """Destroy the Vicon interface."""
-        # Note: No cleanup is needed for the offline Vicon system, so this is a no-op.
-        pass
+        # If a background thread is being used to prefetch frames, stop it. No other cleanup is needed.
+        if self.__prefetch_thread is not None:
+            self.__prefetch_stop.set()
+            self.__prefetch_thread.join()
+            self.__prefetch_thread = None
+
+    # PUBLIC STATIC METHODS
+
+    @staticmethod
+    def save_binary_frame(filename: str, subjects: Dict[str, "OfflineViconInterface.Subject"]) -> None:
+        """
+        Save a frame of Vicon data to a binary file on disk (see ViconFrameFormat.BINARY).
+
+        .. note::
+            See __load_binary_frame for a description of the file layout.
+
+        :param filename:    The name of the binary file.
+        :param subjects:    The Vicon subjects present in the frame.
+        """
+        arrays: Dict[str, np.ndarray] = {"subjects": np.array(list(subjects.keys()), dtype=str)}
+
+        for subject_name, subject in subjects.items():
+            fields: Dict[str, OfflineViconInterface.ArrayMapping] = {
+                "markers": subject.marker_positions,
+                "seg_global": subject.segment_global_poses,
+                "seg_local": subject.segment_local_rotations
+            }
+
+            for field, mapping in fields.items():
+                arrays[f"sub/{subject_name}/{field}/names"] = np.array(mapping.names, dtype=str)
+                arrays[f"sub/{subject_name}/{field}/values"] = mapping.array.astype(np.float32, copy=False)
+                arrays[f"sub/{subject_name}/{field}/known"] = mapping.known
+
+        # Note: We write the frame to a temporary file in the same folder and then move it into place, so that an
+        #       interrupted save can't leave a truncated file behind under the final name. We pass an open file to
+        #       np.savez so as to stop it appending ".npz" to the filename.
+        temp_filename: str = f"{filename}.{os.getpid()}.tmp"
+        try:
+            with open(temp_filename, "wb") as f:
+                np.savez(f, **arrays)
+            os.replace(temp_filename, filename)
+        finally:
+            if os.path.exists(temp_filename):
+                os.remove(temp_filename)
+
+    # PRIVATE METHODS
+
+    def __get_prefetched_frame(self) \
+            -> Optional[Tuple[int, Union[Dict[str, "OfflineViconInterface.Subject"], Exception]]]:
+        """
+        Get the next prefetched frame from the background thread, waiting for it to be decoded if necessary.
+
+        :return:    A pair consisting of the index of the frame and either its subjects or the exception raised whilst
+                    decoding it, or None if prefetching has stopped (e.g. because the interface has been terminated).
+        """
+        while not self.__prefetch_stop.is_set():
+            try:
+                return self.__prefetch_queue.get(timeout=0.1)
+            except queue.Empty:
+                # If the background thread has exited, no more frames will be put into the queue, so one last check
+                # suffices to tell whether the frame we want is ever going to arrive.
+                if self.__prefetch_thread is None or not self.__prefetch_thread.is_alive():
+                    try:
+                        return self.__prefetch_queue.get_nowait()
+                    except queue.Empty:
+                        return None
+
+        return None
+
+    def __get_subjects(self) -> Dict[str, "OfflineViconInterface.Subject"]:
+        """
+        Get the Vicon subjects present in the current frame, decoding the frame if necessary.
+
+        :return:    The Vicon subjects present in the current frame (if any).
+        """
+        # If the current frame has already been looked up, return its subjects straight away.
+        if self.__current_subjects is not None:
+            return self.__current_subjects
+
+        if self.__current_frame_idx is None:
+            return {}
+
+        # If the current frame was prefetched but couldn't be decoded, raise the exception that was raised whilst
+        # decoding it.
+        if self.__current_decode_error is not None:
+            raise self.__current_decode_error
+
+        # Otherwise, read in the file for the current frame and decode it. Note that the file is only read at this
+        # point (rather than up-front), so that we never hold more than one frame's worth of file contents at once,
+        # and so that a file that can't be read only affects its own frame.
+        self.__current_subjects = OfflineViconInterface.__decode_frame(
+            *OfflineViconInterface.__read_frame_contents(self.__folder, self.__frame_number)
+        )
+        return self.__current_subjects
 
     # PRIVATE STATIC METHODS
 
     @staticmethod
-    def __get_frame_number(filename: str) -> int:
+    def __decode_frame(frame_format: ViconFrameFormat, contents: bytes) -> Dict[str, "OfflineViconInterface.Subject"]:
+        """
+        Decode a frame of Vicon data from the contents of its file.
+
+        :param frame_format:    The format of the contents.
+        :param contents:        The contents of the file.
+        :return:                The Vicon subjects present in the frame.
+        """
+        if frame_format == ViconFrameFormat.BINARY:
+            return OfflineViconInterface.__load_binary_frame(contents)
+        else:
+            return OfflineViconInterface.__load_text_frame(contents)
+
+    @staticmethod
+    def __ensure_binary_cache(folder: str, frame_numbers: List[int]) -> None:
+        """
+        Make sure that each of the specified frames in a folder has an up-to-date binary version.
+
+        .. note::
+            Any frame that has only been saved in text format, or whose text file has been modified since its binary
+            file was written, is parsed (once) and its contents are saved to disk in binary form. If the binary files
+            can't be written (e.g. because the folder is read-only), we simply fall back to loading the text files
+            during playback.
+
+        :param folder:          The folder containing the frame files.
+        :param frame_numbers:   The frame numbers.
+        """
+        for frame_number in frame_numbers:
+            if OfflineViconInterface.__has_current_binary_frame(folder, frame_number):
+                continue
+
+            with open(os.path.join(folder, ViconFrameFormat.TEXT.make_filename(frame_number)), "rb") as f:
+                subjects: Dict[str, OfflineViconInterface.Subject] = OfflineViconInterface.__load_text_frame(f.read())
+
+            binary_filename: str = os.path.join(folder, ViconFrameFormat.BINARY.make_filename(frame_number))
+            try:
+                OfflineViconInterface.save_binary_frame(binary_filename, subjects)
+            except OSError as e:
+                print(f"Warning: Could not cache Vicon frames in binary format in '{folder}': {e}")
+                return
+
+    @staticmethod
+    def __has_current_binary_frame(folder: str, frame_number: int) -> bool:
+        """
+        Determine whether or not the specified frame in a folder has a binary version that is up to date.
+
+        .. note::
+            A binary version is treated as out of date if the frame's text file has been modified since.
+
+        :param folder:          The folder containing the frame files.
+        :param frame_number:    The frame number.
+        :return:                True, if the frame has an up-to-date binary version, or False otherwise.
+        """
+        binary_filename: str = os.path.join(folder, ViconFrameFormat.BINARY.make_filename(frame_number))
+        text_filename: str = os.path.join(folder, ViconFrameFormat.TEXT.make_filename(frame_number))
+
+        if not os.path.exists(binary_filename):
+            return False
+
+        return not os.path.exists(text_filename) or os.path.getmtime(binary_filename) >= os.path.getmtime(text_filename)
+
+    @staticmethod
+    def __load_binary_frame(contents: bytes) -> Dict[str, "OfflineViconInterface.Subject"]:
         """
-        Get the frame number corresponding to a file containing Vicon frame data.
+        Load a frame of Vicon data from the contents of a binary file.
 
         .. note::
-            The files are named <frame number>.vicon.txt, so we can get the frame numbers directly from the file names.
+            The names of the subjects in the frame are stored under the "subjects" key. Each subject has three
+            fields ("markers", "seg_global" and "seg_local"), each of which is stored as three arrays under the
+            keys sub/<subject>/<field>/{names,values,known} (see OfflineViconInterface.ArrayMapping).
+
+        :param contents:    The contents of the binary file.
+        :return:            The Vicon subjects present in the frame.
+        """
+        subjects: Dict[str, OfflineViconInterface.Subject] = {}
+
+        with np.load(io.BytesIO(contents)) as data:
+            for subject_name in data["subjects"].tolist():
+                mappings: List[OfflineViconInterface.ArrayMapping] = []
+                for field in ("markers", "seg_global", "seg_local"):
+                    prefix: str = f"sub/{subject_name}/{field}"
+                    names: List[str] = data[f"{prefix}/names"].tolist()
+
+                    # Note: The accessors hand out views onto the stored arrays, so we make them read-only to stop
+                    #       callers from accidentally modifying the stored frame.
+                    values: np.ndarray = data[f"{prefix}/values"]
+                    known: np.ndarray = data[f"{prefix}/known"]
+                    values.setflags(write=False)
+                    known.setflags(write=False)
+
+                    # The local rotations are normally saved for the same segments as the global poses, in which
+                    # case they can share the same names and index.
+                    if field == "seg_local" and names == mappings[-1].names:
+                        mappings.append(OfflineViconInterface.ArrayMapping(
+                            mappings[-1].names, values, known, name_to_row=mappings[-1].name_to_row
+                        ))
+                    else:
+                        mappings.append(OfflineViconInterface.ArrayMapping(names, values, known))
+
+                subjects[subject_name] = OfflineViconInterface.Subject(*mappings)
+
+        return subjects
+
+    @staticmethod
+    def __load_text_frame(contents: bytes) -> Dict[str, "OfflineViconInterface.Subject"]:
+        """
+        Load a frame of Vicon data from the contents of a text file.
 
-        :param filename:    The name of a file containing Vicon frame data.
-        :return:            The corresponding frame number.
+        :param contents:    The contents of the text file.
+        :return:            The Vicon subjects present in the frame.
         """
-        frame_number, _, _ = filename.split(".")
-        return int(frame_number)
+        subjects: Dict[str, OfflineViconInterface.Subject] = {}
+
+        # Note: We normalise the line endings, as reading the file in text mode (with universal newlines) would.
+        text: str = contents.decode()
+        if "\r" in text:
+            text = text.replace("\r\n", "\n").replace("\r", "\n")
+
+        # Note: The new version of the file format uses four content lines and one blank line per subject. There's
+        #       also an older version of the file format that didn't save the local rotations and so has one fewer
+        #       content line per subject. We match the block for each subject directly in the text of the whole file.
+        for match in _SUBJECT_BLOCK_RE.finditer(text):
+            subject_name, marker_contents, global_contents, local_contents = match.groups()
+            marker_positions: OfflineViconInterface.ArrayMapping = OfflineViconInterface.__parse_array_mapping(
+                marker_contents, (3,)
+            )
+            segment_global_poses: OfflineViconInterface.ArrayMapping = OfflineViconInterface.__parse_array_mapping(
+                global_contents, (4, 4)
+            )
+
+            # If the block for this subject contains its local rotations, parse them. Otherwise, use an empty map.
+            if local_contents is not None:
+                segment_local_rotations: OfflineViconInterface.ArrayMapping = \
+                    OfflineViconInterface.__parse_array_mapping(local_contents, (3, 3), like=segment_global_poses)
+            else:
+                segment_local_rotations: OfflineViconInterface.ArrayMapping = OfflineViconInterface.ArrayMapping(
+                    [], np.empty((0, 3, 3), dtype=np.float32)
+                )
+
+            subjects[subject_name] = OfflineViconInterface.Subject(
+                marker_positions, segment_global_poses, segment_local_rotations
+            )
+
+        return subjects
 
     @staticmethod
-    def __get_line_contents(line: str) -> str:
+    def __parse_array_mapping(contents: str, shape: Tuple[int, ...], *,
+                              like: Optional["OfflineViconInterface.ArrayMapping"] = None) \
+            -> "OfflineViconInterface.ArrayMapping":
         """
-        Get the contents part of a line in one of the files that contains Vicon frame data.
+        Parse the repr of a dictionary that maps names to flat numpy arrays (or None) into an array mapping.
 
         .. note::
-            The files contain multiple lines of the form "specifier: contents\n". This function simply gets the
-            contents part of such a line.
+            This is used in preference to eval, which would be both slower and unsafe.
         .. note::
-            The contents parts of some of the lines themselves contain ": ", which is why we need to specify a
-            maxsplit of 1 here.
+            The floats for all of the arrays in the dictionary are converted in a single call, and then reshaped
+            into a single (N,) + shape array, rather than constructing a separate small array for each name.
         .. note::
-            The line passed in ends with a "\n", which we strip from the end of the contents before returning.
+            We use single precision, since the precision of the Vicon system is well within that of a float32.
 
-        :param line:    The line whose contents part we want to get.
-        :return:        The contents part of the line.
+        :param contents:    The repr of the dictionary, e.g. "{'LANK': array([0.1, 0.2, 0.3]), 'RANK': None}".
+        :param shape:       The shape into which to reshape each of the flat arrays (e.g. (4, 4) for a pose).
+        :param like:        An optional existing array mapping whose names and index should be shared by the new
+                            mapping if it turns out to have the same names.
+        :return:            The array mapping.
         """
-        _, contents = line.split(": ", maxsplit=1)
-        return contents[:-1]
+        entries: List[Tuple[str, str]] = _ARRAY_ENTRY_RE.findall(contents)
+        names: List[str] = [name for name, _ in entries]
+        name_to_row: Optional[Dict[str, int]] = None
+        if like is not None and names == like.names:
+            names, name_to_row = like.names, like.name_to_row
+
+        known: np.ndarray = np.array([len(floats) > 0 for _, floats in entries], dtype=bool)
+
+        # Convert the floats for all of the known arrays in one go.
+        known_values: np.ndarray = np.fromstring(
+            ",".join([floats for _, floats in entries if floats]), dtype=np.float32, sep=","
+        ).reshape((-1,) + shape)
+
+        # If all of the arrays are known, we can use the converted floats directly. If not, scatter them into the
+        # rows for the known arrays (the other rows are unspecified, and are left as zeros).
+        if known.all():
+            values: np.ndarray = known_values
+        else:
+            values: np.ndarray = np.zeros((len(names),) + shape, dtype=np.float32)
+            values[known] = known_values
+
+        # Note: The accessors hand out views onto the stored arrays, so we make them read-only to stop callers from
+        #       accidentally modifying the stored frame.
+        values.setflags(write=False)
+        known.setflags(write=False)
+
+        return OfflineViconInterface.ArrayMapping(names, values, known, name_to_row=name_to_row)
 
     @staticmethod
-    def __make_pose_matrix(flat_pose: List[float]) -> np.ndarray:
+    def __prefetch_frames(folder: str, frame_numbers: List[int], prefetch_queue: queue.Queue,
+                          prefetch_stop: threading.Event) -> None:
         """
-        Convert a flat array of 16 floats in row-major order into a 4*4 pose matrix.
+        Read and decode the frames in order on a background thread, passing them back to get_frame via the queue.
+
+        .. note::
+            If a frame can't be read or decoded, the exception is passed back in place of the frame's subjects, and
+            we move on to the next frame (as would happen if the frames were decoded lazily).
+        .. note::
+            This is deliberately a static method that's only given what it needs, so that the background thread
+            doesn't keep the interface itself alive.
 
-        :param flat_pose:   A flat array of 16 floats in row-major order.
-        :return:            The corresponding 4*4 pose matrix.
+        :param folder:          The folder containing the frame files.
+        :param frame_numbers:   The numbers of the frames to decode, in order.
+        :param prefetch_queue:  The queue via which to pass the decoded frames back to get_frame.
+        :param prefetch_stop:   An event that will be set when the thread should stop.
         """
-        return np.array(flat_pose).reshape(4, 4)
+        for frame_idx, frame_number in enumerate(frame_numbers):
+            try:
+                result: Union[Dict[str, OfflineViconInterface.Subject], Exception] = \
+                    OfflineViconInterface.__decode_frame(
+                        *OfflineViconInterface.__read_frame_contents(folder, frame_number)
+                    )
+            except Exception as e:
+                result = e
+
+            # Wait for there to be space in the queue, checking periodically whether we've been asked to stop.
+            while True:
+                if prefetch_stop.is_set():
+                    return
+
+                try:
+                    prefetch_queue.put((frame_idx, result), timeout=0.1)
+                    break
+                except queue.Full:
+                    pass
 
     @staticmethod
-    def __make_rotation_matrix(flat_rot: List[float]) -> np.ndarray:
+    def __read_frame_contents(folder: str, frame_number: int) -> Tuple[ViconFrameFormat, bytes]:
         """
-        Convert a flat array ot 9 floats in row-major order into a 3*3 rotation matrix.
+        Read in the contents of the file for a frame, preferring the binary version of the frame if it's up to date.
 
-        :param flat_rot:    A flat array of 9 floats in row-major order.
-        :return:            The corresponding 3*3 rotation matrix.
+        :param folder:          The folder containing the frame files.
+        :param frame_number:    The frame number.
+        :return:                A pair consisting of the format of the contents, and the contents themselves.
         """
-        return np.array(flat_rot).reshape(3, 3)
+        frame_format: ViconFrameFormat = ViconFrameFormat.BINARY
+        if not OfflineViconInterface.__has_current_binary_frame(folder, frame_number):
+            frame_format = ViconFrameFormat.TEXT
+
+        with open(os.path.join(folder, frame_format.make_filename(frame_number)), "rb") as f:
+            return frame_format, f.read()
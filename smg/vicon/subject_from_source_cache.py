@@ -16,13 +16,25 @@ class SubjectFromSourceCache:
         Construct a subject-from-source cache.
 
         .. note::
-            The transformations are originally calculated offline by a separate script and saved to disk.
+            The transformations are originally calculated offline by a separate script and saved to disk. Since they
+            don't change whilst the cache is in use, we load all of them in up-front, so that looking up the
+            transformation for a subject never needs to touch the disk.
 
         :param folder:  A folder containing the files from which to load the transformations.
         """
-        self.__folder: str = folder
         self.__subjects_from_sources: Dict[str, np.ndarray] = {}
 
+        # Load in the transformations from any files of the form subject_from_source-<subject name>.txt in the folder.
+        # If the folder doesn't exist, the cache is simply left empty.
+        prefix: str = "subject_from_source-"
+        suffix: str = ".txt"
+        if os.path.isdir(folder):
+            with os.scandir(folder) as it:
+                for entry in it:
+                    if entry.name.startswith(prefix) and entry.name.endswith(suffix):
+                        subject_name: str = entry.name[len(prefix):-len(suffix)]
+                        self.__subjects_from_sources[subject_name] = PoseUtil.load_pose(entry.path)
+
     # PUBLIC METHODS
 
     def get(self, subject_name: str) -> Optional[np.ndarray]:
@@ -33,27 +45,4 @@ class SubjectFromSourceCache:
         :return:                The subject-from-source transformation for the Vicon subject, if available,
                                 or None otherwise.
         """
-        # Try to find the transformation for the subject in the cache.
-        subject_from_source: Optional[np.ndarray] = self.__subjects_from_sources.get(subject_name)
-
-        # If the transformation's present in the cache, return it.
-        if subject_from_source is not None:
-            return subject_from_source
-
-        # Otherwise, if the transformation is not in the cache:
-        else:
-            # Look for the file containing the transformation on disk.
-            filename: str = os.path.join(self.__folder, f"subject_from_source-{subject_name}.txt")
-
-            # If the file exists:
-            if os.path.exists(filename):
-                # Load in the transformation.
-                subject_from_source = PoseUtil.load_pose(filename)
-
-                # Store it in the cache for future reference, and then return it.
-                self.__subjects_from_sources[subject_name] = subject_from_source
-                return subject_from_source
-
-            # Otherwise, if the file containing the transformation doesn't exist, return None.
-            else:
-                return None
+        return self.__subjects_from_sources.get(subject_name)
@@ -0,0 +1,22 @@
+from enum import Enum
+
+
+class ViconFrameFormat(Enum):
+    """The formats in which frames of Vicon data can be saved to disk."""
+
+    # Each frame is saved as a human-readable text file. These are slow to load, since they need to be parsed.
+    TEXT = ".vicon.txt"
+
+    # Each frame is saved as a binary NumPy archive. These are much faster to load than the text files.
+    BINARY = ".vicon.npz"
+
+    # PUBLIC METHODS
+
+    def make_filename(self, frame_number: int) -> str:
+        """
+        Make the name of the file in which to save the specified frame in this format.
+
+        :param frame_number:    The frame number.
+        :return:                The name of the file, i.e. <frame number>.vicon.txt or <frame number>.vicon.npz.
+        """
+        return f"{frame_number}{self.value}"
@@ -1,8 +1,10 @@
 import numpy as np
 import os
 
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 
+from .offline_vicon_interface import OfflineViconInterface
+from .vicon_frame_format import ViconFrameFormat
 from .vicon_interface import ViconInterface
 
 
@@ -11,14 +13,16 @@ class ViconFrameSaver:
 
     # CONSTRUCTOR
 
-    def __init__(self, *, folder: str, vicon: ViconInterface):
+    def __init__(self, *, folder: str, vicon: ViconInterface, frame_format: ViconFrameFormat = ViconFrameFormat.TEXT):
         """
         Construct a Vicon frame saver.
 
-        :param folder:  The folder on disk to which to save Vicon frames.
-        :param vicon:   The Vicon interface.
+        :param folder:          The folder on disk to which to save Vicon frames.
+        :param vicon:           The Vicon interface.
+        :param frame_format:    The format in which to save the Vicon frames.
         """
         self.__folder: str = folder
+        self.__frame_format: ViconFrameFormat = frame_format
         self.__vicon: ViconInterface = vicon
 
         # Make sure the folder exists.
@@ -28,45 +32,104 @@ class ViconFrameSaver:
 
     def save_frame(self) -> None:
         """Save the current frame of Vicon data to disk."""
-        output: str = ""
+        filename: str = os.path.join(self.__folder, self.__frame_format.make_filename(self.__vicon.get_frame_number()))
+
+        if self.__frame_format == ViconFrameFormat.BINARY:
+            self.__save_binary_frame(filename)
+        else:
+            self.__save_text_frame(filename)
+
+    # PRIVATE METHODS
+
+    def __save_binary_frame(self, filename: str) -> None:
+        """
+        Save the current frame of Vicon data to disk in binary format.
+
+        :param filename:    The name of the file to which to save the frame.
+        """
+        subjects: Dict[str, OfflineViconInterface.Subject] = {}
 
         for subject_name in self.__vicon.get_subject_names():
-            output += f"Subject: {subject_name}\n"
-
-            output += "Marker Positions: "
-            output += repr(self.__vicon.get_marker_positions(subject_name))
-            output += "\n"
-
-            segment_names: List[str] = self.__vicon.get_segment_names(subject_name)
-            segment_global_poses: Dict[str, Optional[np.ndarray]] = {}
-            segment_local_rotations: Dict[str, Optional[np.ndarray]] = {}
-
-            for segment_name in segment_names:
-                segment_global_pose: Optional[np.ndarray] = self.__vicon.get_segment_global_pose(
-                    subject_name, segment_name
-                )
-                if segment_global_pose is not None:
-                    segment_global_pose = segment_global_pose.ravel()
-                segment_global_poses[segment_name] = segment_global_pose
-
-                segment_local_rotation: Optional[np.ndarray] = self.__vicon.get_segment_local_rotation(
-                    subject_name, segment_name
-                )
-                if segment_local_rotation is not None:
-                    segment_local_rotation = segment_local_rotation.ravel()
-                segment_local_rotations[segment_name] = segment_local_rotation
-
-            output += "Segment Global Poses: "
+            segment_names, global_poses, local_rotations = self.__vicon.get_segment_data(subject_name)
+            global_known, local_known = ViconFrameSaver.__get_known_masks(global_poses, local_rotations)
+
+            segment_global_poses: OfflineViconInterface.ArrayMapping = OfflineViconInterface.ArrayMapping(
+                segment_names, global_poses, global_known
+            )
+            segment_local_rotations: OfflineViconInterface.ArrayMapping = OfflineViconInterface.ArrayMapping(
+                segment_names, local_rotations, local_known, name_to_row=segment_global_poses.name_to_row
+            )
+
+            subjects[subject_name] = OfflineViconInterface.Subject(
+                OfflineViconInterface.ArrayMapping.from_dict(self.__vicon.get_marker_positions(subject_name), (3,)),
+                segment_global_poses,
+                segment_local_rotations
+            )
+
+        OfflineViconInterface.save_binary_frame(filename, subjects)
+
+    def __save_text_frame(self, filename: str) -> None:
+        """
+        Save the current frame of Vicon data to disk in text format.
+
+        :param filename:    The name of the file to which to save the frame.
+        """
+        # Note: The output is built up as a list of fragments and then written out in one go, rather than being
+        #       built up by repeated string concatenation. We encode it ourselves and write it in binary mode, which
+        #       avoids the newline translation layer of text mode (the offline interface accepts either line ending).
+        # Note: The Vicon interfaces return single-precision arrays, but we convert them to double precision before
+        #       writing them out. This keeps the reprs free of a "dtype=float32" suffix, so that the text files stay
+        #       readable by anything that evaluates them (as older versions of the offline interface did).
+        parts: List[str] = []
+
+        for subject_name in self.__vicon.get_subject_names():
+            parts.append(f"Subject: {subject_name}\n")
+
+            marker_positions: Dict[str, Optional[np.ndarray]] = {
+                marker_name: position.astype(np.float64) if position is not None else None
+                for marker_name, position in self.__vicon.get_marker_positions(subject_name).items()
+            }
+
+            parts.append("Marker Positions: ")
+            parts.append(repr(marker_positions))
+            parts.append("\n")
+
+            segment_names, global_poses, local_rotations = self.__vicon.get_segment_data(subject_name)
+            global_known, local_known = ViconFrameSaver.__get_known_masks(global_poses, local_rotations)
+            global_poses = global_poses.astype(np.float64)
+            local_rotations = local_rotations.astype(np.float64)
+
+            segment_global_poses: Dict[str, Optional[np.ndarray]] = {
+                segment_name: global_poses[i].ravel() if global_known[i] else None
+                for i, segment_name in enumerate(segment_names)
+            }
+            segment_local_rotations: Dict[str, Optional[np.ndarray]] = {
+                segment_name: local_rotations[i].ravel() if local_known[i] else None
+                for i, segment_name in enumerate(segment_names)
+            }
+
+            parts.append("Segment Global Poses: ")
             with np.printoptions(linewidth=np.inf):
-                output += repr(segment_global_poses)
-            output += "\n"
+                parts.append(repr(segment_global_poses))
+            parts.append("\n")
 
-            output += "Segment Local Rotations: "
+            parts.append("Segment Local Rotations: ")
             with np.printoptions(linewidth=np.inf):
-                output += repr(segment_local_rotations)
-            output += "\n\n"
+                parts.append(repr(segment_local_rotations))
+            parts.append("\n\n")
 
-        filename: str = os.path.join(self.__folder, f"{self.__vicon.get_frame_number()}.vicon.txt")
+        with open(filename, "wb") as f:
+            f.write("".join(parts).encode())
 
-        with open(filename, "w") as f:
-            f.write(output)
+    # PRIVATE STATIC METHODS
+
+    @staticmethod
+    def __get_known_masks(global_poses: np.ndarray, local_rotations: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Determine which of the segment poses and local rotations returned by ViconInterface.get_segment_data are known.
+
+        :param global_poses:    The M x 4 x 4 array of global poses (the rows for any unknown poses are NaN-filled).
+        :param local_rotations: The M x 3 x 3 array of local rotations (the rows for any unknown ones are NaN-filled).
+        :return:                A pair of boolean arrays indicating which of the poses and rotations are known.
+        """
+        return ~np.isnan(global_poses[:, 3, 3]), ~np.isnan(local_rotations[:, 0, 0])
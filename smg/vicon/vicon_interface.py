@@ -1,7 +1,7 @@
 import numpy as np
 
 from abc import ABC, abstractmethod
-from typing import Dict, List, Optional
+from typing import Dict, List, Mapping, Optional, Tuple
 
 from .subject_from_source_cache import SubjectFromSourceCache
 
@@ -30,13 +30,18 @@ class ViconInterface(ABC):
         pass
 
     @abstractmethod
-    def get_marker_positions(self, subject_name: str) -> Dict[str, np.ndarray]:
+    def get_marker_positions(self, subject_name: str) -> Mapping[str, np.ndarray]:
         """
         Try to get the latest positions of the markers for the subject with the specified name.
 
+        .. note::
+            The mapping returned, and the position arrays it contains, are read-only (implementations may return
+            views onto data they store). Callers that want to modify them (e.g. to add hallucinated markers) must
+            make their own copies, or layer a mapping of their own on top.
+
         :param subject_name:    The name of the subject.
         :return:                The latest positions of the markers for the subject (indexed by name), if possible,
-                                or the empty dictionary otherwise.
+                                or an empty mapping otherwise.
         """
         pass
 
@@ -45,6 +50,10 @@ class ViconInterface(ABC):
         """
         Try to get the current global 6D pose of the specified segment for the specified subject.
 
+        .. note::
+            The pose returned may be read-only (e.g. if it's a view onto data that an implementation stores), so
+            callers that want to modify it must copy it first.
+
         :param subject_name:    The name of the subject.
         :param segment_name:    The name of the segment.
         :return:                The current global 6D pose of the segment, if possible, or None otherwise.
@@ -56,6 +65,9 @@ class ViconInterface(ABC):
         """
         Try to get the current local rotation matrix of the specified segment for the specified subject.
 
+        .. note::
+            As with get_segment_global_pose, the matrix returned may be read-only.
+
         :param subject_name:    The name of the subject.
         :param segment_name:    The name of the segment.
         :return:                The current local rotation matrix of the segment, if possible, or None otherwise.
@@ -104,7 +116,122 @@ class ViconInterface(ABC):
         """
         subject_from_source: Optional[np.ndarray] = subject_from_source_cache.get(subject_name)
         subject_from_vicon: Optional[np.ndarray] = self.get_segment_global_pose(subject_name, subject_name)
-        if subject_from_source is not None and subject_from_vicon is not None:
-            return np.linalg.inv(subject_from_vicon) @ subject_from_source
-        else:
+        if subject_from_source is None or subject_from_vicon is None:
             return None
+
+        # Since subject_from_vicon = [R | t] is rigid, vicon_from_source = [R^T | -R^T t] * subject_from_source can
+        # be computed directly as [R^T * Rs | R^T * (ts - t)], where [Rs | ts] = subject_from_source, without either
+        # forming the inverse explicitly or multiplying two full 4x4 matrices.
+        vicon_from_subject_rot: np.ndarray = subject_from_vicon[0:3, 0:3].T
+        vicon_from_source: np.ndarray = np.empty(
+            (4, 4), dtype=np.result_type(subject_from_vicon, subject_from_source)
+        )
+        np.matmul(vicon_from_subject_rot, subject_from_source[0:3, :], out=vicon_from_source[0:3, :])
+        vicon_from_source[0:3, 3] -= vicon_from_subject_rot @ subject_from_vicon[0:3, 3]
+        vicon_from_source[3] = (0, 0, 0, 1)
+        return vicon_from_source
+
+    def get_marker_data(self, subject_name: str) -> Tuple[List[str], np.ndarray, np.ndarray]:
+        """
+        Try to get the latest positions of all of the markers for the specified subject in one go.
+
+        .. note::
+            The contents of the rows corresponding to markers whose positions are unknown are unspecified.
+        .. note::
+            By default, this is implemented in terms of get_marker_positions (and so only includes the markers
+            whose positions are known), but implementations can override it to pack the positions directly.
+        .. note::
+            The arrays returned may be read-only (e.g. if they're views onto data that an implementation stores),
+            so callers that want to modify them must copy them first.
+
+        :param subject_name:    The name of the subject.
+        :return:                A tuple consisting of the names of the markers, an N x 3 array of their positions,
+                                and a boolean array of length N indicating which of the positions are known.
+        """
+        marker_positions: Mapping[str, np.ndarray] = self.get_marker_positions(subject_name)
+        positions: np.ndarray = np.empty((len(marker_positions), 3), dtype=np.float32)
+        for i, position in enumerate(marker_positions.values()):
+            positions[i] = position
+
+        return list(marker_positions.keys()), positions, np.ones(len(marker_positions), dtype=bool)
+
+    def get_segment_data(self, subject_name: str) -> Tuple[List[str], np.ndarray, np.ndarray]:
+        """
+        Try to get the current global 6D poses and local rotation matrices of all of the segments for the specified
+        subject in one go.
+
+        .. note::
+            The rows corresponding to any unknown poses or rotations are filled with NaNs.
+        .. note::
+            By default, this simply calls the per-segment methods, but implementations can override it to fetch
+            the data in bulk and pack it directly into the output arrays.
+
+        :param subject_name:    The name of the subject.
+        :return:                A tuple consisting of the names of the subject's segments, an M x 4 x 4 array of
+                                their global 6D poses, and an M x 3 x 3 array of their local rotation matrices.
+        """
+        segment_names: List[str] = self.get_segment_names(subject_name)
+        global_poses: np.ndarray = np.full((len(segment_names), 4, 4), np.nan, dtype=np.float32)
+        local_rotations: np.ndarray = np.full((len(segment_names), 3, 3), np.nan, dtype=np.float32)
+
+        for i, segment_name in enumerate(segment_names):
+            global_pose: Optional[np.ndarray] = self.get_segment_global_pose(subject_name, segment_name)
+            if global_pose is not None:
+                global_poses[i] = global_pose
+
+            local_rotation: Optional[np.ndarray] = self.get_segment_local_rotation(subject_name, segment_name)
+            if local_rotation is not None:
+                local_rotations[i] = local_rotation
+
+        return segment_names, global_poses, local_rotations
+
+    def get_segment_global_pose_inverse(self, subject_name: str, segment_name: str) -> Optional[np.ndarray]:
+        """
+        Try to get the inverse of the current global 6D pose of the specified segment for the specified subject.
+
+        .. note::
+            Whereas the global pose is a transformation from world (Vicon) space to segment space, its inverse is a
+            transformation from segment space to world space. By default, this is computed by inverting the pose,
+            but implementations that have direct access to the inverse can override this to avoid doing so.
+
+        :param subject_name:    The name of the subject.
+        :param segment_name:    The name of the segment.
+        :return:                The inverse of the current global 6D pose of the segment, if possible, or None
+                                otherwise.
+        """
+        segment_from_world: Optional[np.ndarray] = self.get_segment_global_pose(subject_name, segment_name)
+        return ViconInterface.invert_rigid_transform(segment_from_world) if segment_from_world is not None else None
+
+    def refresh_topology(self) -> None:
+        """
+        Clear any cached information about the topology (marker and segment names) of the subjects.
+
+        .. note::
+            This only needs to be called if the subjects are redefined mid-capture. By default, it's a no-op,
+            since not all Vicon interfaces cache this information.
+        """
+        pass
+
+    # PUBLIC STATIC METHODS
+
+    @staticmethod
+    def invert_rigid_transform(m: np.ndarray, *, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Invert a rigid 4x4 transformation matrix.
+
+        .. note::
+            Since the transformation [R | t] is rigid, its inverse is simply [R^T | -R^T t], so there's no need to
+            call np.linalg.inv (which is written for arbitrary matrices, and so is much slower).
+
+        :param m:   The rigid transformation matrix to invert.
+        :param out: An optional 4x4 array into which to write the inverse (this must not be m itself).
+        :return:    The inverse of the transformation matrix.
+        """
+        if out is None:
+            out = np.empty((4, 4), dtype=m.dtype)
+
+        out[0:3, 0:3] = m[0:3, 0:3].T
+        np.matmul(out[0:3, 0:3], m[0:3, 3], out=out[0:3, 3])
+        out[0:3, 3] *= -1
+        out[3] = (0, 0, 0, 1)
+        return out
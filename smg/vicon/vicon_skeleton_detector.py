@@ -1,31 +1,92 @@
 import numpy as np
-import vg
 
-from typing import Callable, Dict, List, Optional, Tuple
+from collections import ChainMap
+from typing import Callable, Dict, List, Mapping, MutableMapping, Optional, Sequence, Set, Tuple
 
 from smg.skeletons import Keypoint, KeypointOrienter, KeypointUtil, Skeleton3D
 
 from .vicon_interface import ViconInterface
 
 
+# The names of the keypoints for which midhip-from-rest transforms are specified, and the transforms themselves. The
+# transforms are stored as single-precision rows of a single stacked (K,3,3) array (matching the precision of the
+# Vicon data). This is built once, when the module is loaded, and made read-only, since views onto its rows are
+# shared by every detector and handed to the keypoint orienter for every skeleton constructed.
+# FIXME: These need to be properly checked next time I have access to the Vicon system.
+_MIDHIP_FROM_RESTS_NAMES: Tuple[str, ...] = (
+    "LElbow", "LHip", "LKnee", "LShoulder", "MidHip", "Neck", "RElbow", "RHip", "RKnee", "RShoulder"
+)
+
+_MIDHIP_FROM_RESTS_STACK: np.ndarray = np.array([
+    [[0, 1, 0], [-1, 0, 0], [0, 0, 1]],     # LElbow
+    [[1, 0, 0], [0, 1, 0], [0, 0, 1]],      # LHip
+    [[1, 0, 0], [0, 1, 0], [0, 0, 1]],      # LKnee
+    [[0, 1, 0], [-1, 0, 0], [0, 0, 1]],     # LShoulder
+    [[1, 0, 0], [0, 1, 0], [0, 0, 1]],      # MidHip
+    [[-1, 0, 0], [0, -1, 0], [0, 0, 1]],    # Neck
+    [[0, -1, 0], [1, 0, 0], [0, 0, 1]],     # RElbow
+    [[1, 0, 0], [0, 1, 0], [0, 0, 1]],      # RHip
+    [[1, 0, 0], [0, 1, 0], [0, 0, 1]],      # RKnee
+    [[0, -1, 0], [1, 0, 0], [0, 0, 1]]      # RShoulder
+], dtype=np.float32)
+_MIDHIP_FROM_RESTS_STACK.setflags(write=False)
+
+
 class ViconSkeletonDetector:
     """A 3D skeleton detector based on a Vicon system."""
 
     # CONSTRUCTOR
 
     def __init__(self, vicon: ViconInterface, *, is_person: Callable[[str, ViconInterface], bool],
-                 use_vicon_poses: bool = False):
+                 use_vicon_poses: bool = False, subject_refresh_interval: int = 1, skip_repeated_frames: bool = False,
+                 cache_person_subjects: bool = False):
         """
         Construct a 3D skeleton detector based on a Vicon system.
 
-        :param vicon:           The Vicon interface.
-        :param is_person:       A function that determines whether or not the specified subject is a person.
-        :param use_vicon_poses: Whether to use the joint poses produced by the Vicon system.
+        .. note::
+            The set of subjects present in the scene normally changes much less often than once per frame, so the
+            list of subjects that are people can optionally be refreshed less often than every frame (at the cost
+            of a short delay before any new person is detected). Subjects that leave the scene are dropped straight
+            away, however, since the people are always checked against the subjects present in the current frame.
+        .. note::
+            By default, the is_person check is re-run on all of the subjects whenever the list is refreshed. If
+            person caching is enabled, it's only re-run when the set of subject names changes (or when refresh_subjects
+            is called). This is only valid if the result of is_person depends solely on the subject (e.g. on the names
+            of its segments), and not on any per-frame data from the Vicon system.
+        .. note::
+            If the detector is called more often than the Vicon system produces new frames, the skeletons detected
+            for the previous frame can optionally be returned again, rather than detecting them afresh.
+
+        :param vicon:                       The Vicon interface.
+        :param is_person:                   A function that determines whether or not the specified subject is a
+                                            person.
+        :param use_vicon_poses:             Whether to use the joint poses produced by the Vicon system.
+        :param subject_refresh_interval:    The number of detections between refreshes of the list of subjects that
+                                            are people (1 means that the list is refreshed for every detection).
+        :param skip_repeated_frames:        Whether to return the skeletons detected for the previous frame again
+                                            (rather than detecting them afresh) if the Vicon frame number hasn't
+                                            changed since the last call to detect_skeletons.
+        :param cache_person_subjects:       Whether to only re-run the is_person check on the subjects when the set of
+                                            subject names changes (see above).
         """
         self.__vicon: ViconInterface = vicon
         self.__is_person: Callable[[str, ViconInterface], bool] = is_person
         self.__use_vicon_poses: bool = use_vicon_poses
 
+        # The names of the subjects that are people (if known), the names of all the subjects from which they were
+        # chosen, and the number of detections before the list of them next needs to be refreshed.
+        self.__cache_person_subjects: bool = cache_person_subjects
+        self.__frames_until_subject_refresh: int = 0
+        self.__known_subjects: Set[str] = set()
+        self.__person_subjects: Optional[List[str]] = None
+        self.__subject_refresh_interval: int = subject_refresh_interval
+
+        # The number of the Vicon frame for which skeletons were last detected, and the skeletons themselves. These
+        # are only used if we're skipping repeated frames.
+        self.__last_frame_number: Optional[int] = None
+        self.__last_skeletons: Dict[str, Skeleton3D] = {}
+        self.__skip_repeated_frames: bool = skip_repeated_frames
+
         # Specify which keypoints are joined to form bones.
         self.__keypoint_pairs: List[Tuple[str, str]] = [
             ("Head", "Neck"),
@@ -48,37 +109,38 @@ class ViconSkeletonDetector:
 
         # A mapping from Vicon marker names to keypoints. Note that whilst these markers directly correspond to
         # useful keypoints, some other keypoints (e.g. MidHip) have to be computed based on the positions of
-        # multiple markers (see the detect_skeletons function).
-        self.__marker_to_keypoint: Dict[str, str] = {
-            "LANK": "LAnkle",
-            "LELB": "LElbow",
-            "LKNE": "LKnee",
-            "LSHO": "LShoulder",
-            "LTOE": "LToe",
-            "RANK": "RAnkle",
-            "RELB": "RElbow",
-            "RKNE": "RKnee",
-            "RSHO": "RShoulder",
-            "RTOE": "RToe"
-        }
-
-        # A mapping specifying the midhip-from-rest transforms for the keypoints.
-        # FIXME: These need to be properly checked next time I have access to the Vicon system.
-        lm: np.ndarray = np.array([[0, 1, 0], [-1, 0, 0], [0, 0, 1]])
-        rm: np.ndarray = np.array([[0, -1, 0], [1, 0, 0], [0, 0, 1]])
-
-        self.__midhip_from_rests: Dict[str, np.ndarray] = {
-            "LElbow": lm,
-            "LHip": np.eye(3),
-            "LKnee": np.eye(3),
-            "LShoulder": lm,
-            "MidHip": np.eye(3),
-            "Neck": np.array([[-1, 0, 0], [0, -1, 0], [0, 0, 1]]),
-            "RElbow": rm,
-            "RHip": np.eye(3),
-            "RKnee": np.eye(3),
-            "RShoulder": rm
-        }
+        # multiple markers (see the detect_skeletons function). Note also that since this mapping is only ever
+        # iterated over (once per subject per frame), we store it as a tuple of (marker, keypoint) pairs.
+        self.__marker_to_keypoint: Tuple[Tuple[str, str], ...] = (
+            ("LANK", "LAnkle"),
+            ("LELB", "LElbow"),
+            ("LKNE", "LKnee"),
+            ("LSHO", "LShoulder"),
+            ("LTOE", "LToe"),
+            ("RANK", "RAnkle"),
+            ("RELB", "RElbow"),
+            ("RKNE", "RKnee"),
+            ("RSHO", "RShoulder"),
+            ("RTOE", "RToe")
+        )
+
+        # The keypoints whose positions are the result of averaging the positions of several Vicon markers. For each
+        # such keypoint, we specify different sets of markers whose positions can be averaged to compute its position
+        # (these will be tried in order). Note that these are set up once here, rather than on every frame.
+        self.__composite_keypoints: Tuple[Tuple[str, Tuple[Tuple[str, ...], ...]], ...] = (
+            ("Head", (("LBHD", "LFHD", "RBHD", "RFHD"),)),
+            ("LHip", (("LASI", "LPSI"),)),
+            ("LWrist", (("LWRA", "LWRB"), ("LWRA",), ("LWRB",), ("LFIN",))),
+            ("MidHip", (("LASI", "LPSI", "RASI", "RPSI"), ("LASI", "RPSI"), ("RASI", "LPSI"))),
+            ("Neck", (("LSHO", "RSHO"),)),
+            ("RHip", (("RASI", "RPSI"),)),
+            ("RWrist", (("RWRA", "RWRB"), ("RWRA",), ("RWRB",), ("RFIN",)))
+        )
+
+        # A mapping specifying the midhip-from-rest transforms for the keypoints. The transforms themselves are
+        # constants that are shared by all detectors (see _MIDHIP_FROM_RESTS_STACK), so the mapping simply refers
+        # to views onto the rows of the shared stack.
+        self.__midhip_from_rests: Dict[str, np.ndarray] = dict(zip(_MIDHIP_FROM_RESTS_NAMES, _MIDHIP_FROM_RESTS_STACK))
 
         # A mapping specifying the child to parent relationships between the keypoints.
         self.__parent_keypoints: Dict[str, str] = {
@@ -94,16 +156,17 @@ class ViconSkeletonDetector:
         }
 
         # A mapping from Vicon segment names to the keypoints that control the poses of the corresponding bones.
-        self.__segment_to_keypoint: Dict[str, str] = {
-            "L_Elbow": "LElbow",
-            "R_Elbow": "RElbow",
-            "L_Femur": "LHip",
-            "R_Femur": "RHip",
-            "L_Humerus": "LShoulder",
-            "R_Humerus": "RShoulder",
-            "L_Tibia": "LKnee",
-            "R_Tibia": "RKnee"
-        }
+        # As with the marker to keypoint mapping, we store this as a tuple of (segment, keypoint) pairs.
+        self.__segment_to_keypoint: Tuple[Tuple[str, str], ...] = (
+            ("L_Elbow", "LElbow"),
+            ("R_Elbow", "RElbow"),
+            ("L_Femur", "LHip"),
+            ("R_Femur", "RHip"),
+            ("L_Humerus", "LShoulder"),
+            ("R_Humerus", "RShoulder"),
+            ("L_Tibia", "LKnee"),
+            ("R_Tibia", "RKnee")
+        )
 
     # PUBLIC METHODS
 
@@ -113,16 +176,49 @@ class ViconSkeletonDetector:
 
         :return:    The detected 3D skeletons.
         """
+        # If we're skipping repeated frames, and the Vicon frame hasn't changed since we last detected skeletons,
+        # return the skeletons we detected last time.
+        frame_number: Optional[int] = None
+        if self.__skip_repeated_frames:
+            frame_number = self.__vicon.get_frame_number()
+            if frame_number is not None and frame_number == self.__last_frame_number:
+                return self.__last_skeletons
+
         skeletons: Dict[str, Skeleton3D] = {}
 
-        # For each relevant Vicon subject:
-        for subject in self.__vicon.get_subject_names():
-            # If the subject is not a person, skip it.
-            if not self.__is_person(subject, self.__vicon):
+        # Get the names of the subjects that are currently present.
+        subjects: List[str] = self.__vicon.get_subject_names()
+        current_subjects: Set[str] = set(subjects)
+
+        # If necessary, refresh the list of subjects that are people. If we're caching the people, we assume that
+        # whether or not a subject is a person doesn't change whilst the set of subjects stays the same, and so only
+        # re-run the is_person check on the subjects if the set of subjects has changed since we last ran it (or if
+        # we've been asked to).
+        if self.__person_subjects is None or self.__frames_until_subject_refresh <= 0:
+            if self.__person_subjects is None or not self.__cache_person_subjects \
+                    or current_subjects != self.__known_subjects:
+                self.__known_subjects = current_subjects
+                self.__person_subjects = [subject for subject in subjects if self.__is_person(subject, self.__vicon)]
+
+            self.__frames_until_subject_refresh = self.__subject_refresh_interval
+
+        self.__frames_until_subject_refresh -= 1
+
+        # For each Vicon subject that is a person:
+        for subject in self.__person_subjects:
+            # If the subject is no longer present (e.g. because it has left the scene since the list of people was
+            # last refreshed), skip it.
+            if subject not in current_subjects:
                 continue
 
-            # Otherwise, get its marker positions.
-            marker_positions: Dict[str, np.ndarray] = self.__vicon.get_marker_positions(subject)
+            # Get its marker positions. If none of them are known, skip the subject rather than making an empty
+            # skeleton for it. Note that the positions returned by the Vicon interface are read-only, so we layer
+            # a dictionary on top of them to receive any markers we hallucinate, rather than copying them.
+            vicon_marker_positions: Mapping[str, np.ndarray] = self.__vicon.get_marker_positions(subject)
+            if all(marker_position is None for marker_position in vicon_marker_positions.values()):
+                continue
+
+            marker_positions: MutableMapping[str, np.ndarray] = ChainMap({}, vicon_marker_positions)
 
             # Try to hallucinate some of the missing markers (where feasible).
             ViconSkeletonDetector.__try_hallucinate_missing_markers(marker_positions)
@@ -131,39 +227,28 @@ class ViconSkeletonDetector:
             keypoints: Dict[str, Keypoint] = {}
 
             # First add keypoints whose positions can be derived from a single marker.
-            for marker_name, keypoint in self.__marker_to_keypoint.items():
+            for marker_name, keypoint in self.__marker_to_keypoint:
                 marker_position: Optional[np.ndarray] = marker_positions.get(marker_name)
                 if marker_position is not None:
                     keypoints[keypoint] = Keypoint(keypoint, marker_position)
 
             # Then add keypoints whose positions are the result of averaging the positions of several Vicon markers.
-            ViconSkeletonDetector.__try_add_keypoint(
-                "Head", [["LBHD", "LFHD", "RBHD", "RFHD"]], marker_positions, keypoints
-            )
-            ViconSkeletonDetector.__try_add_keypoint("LHip", [["LASI", "LPSI"]], marker_positions, keypoints)
-            ViconSkeletonDetector.__try_add_keypoint(
-                "LWrist", [["LWRA", "LWRB"], ["LWRA"], ["LWRB"], ["LFIN"]], marker_positions, keypoints
-            )
-            ViconSkeletonDetector.__try_add_keypoint(
-                "MidHip", [["LASI", "LPSI", "RASI", "RPSI"], ["LASI", "RPSI"], ["RASI", "LPSI"]],
-                marker_positions, keypoints
-            )
-            ViconSkeletonDetector.__try_add_keypoint("Neck", [["LSHO", "RSHO"]], marker_positions, keypoints)
-            ViconSkeletonDetector.__try_add_keypoint("RHip", [["RASI", "RPSI"]], marker_positions, keypoints)
-            ViconSkeletonDetector.__try_add_keypoint(
-                "RWrist", [["RWRA", "RWRB"], ["RWRA"], ["RWRB"], ["RFIN"]], marker_positions, keypoints
-            )
+            for keypoint, base_marker_sets in self.__composite_keypoints:
+                ViconSkeletonDetector.__try_add_keypoint(keypoint, base_marker_sets, marker_positions, keypoints)
 
             # If we're using the joint poses from the Vicon system:
             if self.__use_vicon_poses:
                 global_keypoint_poses: Dict[str, np.ndarray] = {}
 
                 # Look up the poses of those keypoints that have a corresponding Vicon segment.
-                for segment, keypoint in self.__segment_to_keypoint.items():
-                    # TODO: Consider making get_segment_global_pose return w_t_c poses instead of c_t_w ones.
-                    keypoint_from_world: Optional[np.ndarray] = self.__vicon.get_segment_global_pose(subject, segment)
-                    if keypoint_from_world is not None:
-                        global_keypoint_poses[keypoint] = np.linalg.inv(keypoint_from_world)
+                for segment, keypoint in self.__segment_to_keypoint:
+                    # Note: We need w_t_c poses rather than c_t_w ones here, so we ask the Vicon interface for those
+                    #       directly (this avoids inverting the poses when the interface has direct access to them).
+                    world_from_keypoint: Optional[np.ndarray] = self.__vicon.get_segment_global_pose_inverse(
+                        subject, segment
+                    )
+                    if world_from_keypoint is not None:
+                        global_keypoint_poses[keypoint] = world_from_keypoint
 
                 # Compute the poses for the other relevant keypoints that don't have a corresponding Vicon segment.
                 midhip_orienter: Optional[KeypointOrienter] = KeypointOrienter.try_make(
@@ -195,13 +280,28 @@ class ViconSkeletonDetector:
                 # Simply add the skeleton to the dictionary, and let the joint poses be computed internally.
                 skeletons[subject] = Skeleton3D(keypoints, self.__keypoint_pairs)
 
+        # If we're skipping repeated frames, record the skeletons we detected for this frame.
+        if self.__skip_repeated_frames:
+            self.__last_frame_number = frame_number
+            self.__last_skeletons = skeletons
+
         return skeletons
 
+    def refresh_subjects(self) -> None:
+        """
+        Force the list of subjects that are people to be refreshed the next time detect_skeletons is called.
+
+        .. note::
+            If person caching is enabled, this also forces the is_person check to be re-run on all of the subjects,
+            e.g. if the subjects have been redefined in the Vicon software without changing their names.
+        """
+        self.__person_subjects = None
+
     # PRIVATE STATIC METHODS
 
     @staticmethod
-    def __try_add_keypoint(keypoint_name: str, base_marker_sets: List[List[str]],
-                           marker_positions: Dict[str, np.ndarray],
+    def __try_add_keypoint(keypoint_name: str, base_marker_sets: Sequence[Sequence[str]],
+                           marker_positions: Mapping[str, np.ndarray],
                            keypoints: Dict[str, Keypoint]) -> None:
         """
         Try to add a keypoint whose position is the result of averaging the positions of several Vicon markers.
@@ -214,29 +314,56 @@ class ViconSkeletonDetector:
         """
         # For each possible set of base markers:
         for base_marker_set in base_marker_sets:
-            # Try to get the markers' positions.
-            base_marker_positions: List[Optional[np.ndarray]] = [marker_positions.get(m) for m in base_marker_set]
+            # Try to get the markers' positions, stopping as soon as we find one that isn't available.
+            base_marker_positions: List[np.ndarray] = []
+            for marker_name in base_marker_set:
+                marker_position: Optional[np.ndarray] = marker_positions.get(marker_name)
+                if marker_position is None:
+                    break
+                base_marker_positions.append(marker_position)
 
             # If all of them are available:
-            if all([p is not None for p in base_marker_positions]):
+            else:
                 # Average them to get the position of the keypoint, then add the keypoint to the list and return.
-                keypoints[keypoint_name] = Keypoint(keypoint_name, np.mean(base_marker_positions, axis=0))
+                # Note that we accumulate the positions in place, rather than calling np.mean, which would first
+                # have to copy the positions into a new array. If there's only one marker, we use its position as is.
+                keypoint_position: np.ndarray = base_marker_positions[0]
+                if len(base_marker_positions) > 1:
+                    keypoint_position = keypoint_position.copy()
+                    for p in base_marker_positions[1:]:
+                        keypoint_position += p
+                    keypoint_position /= len(base_marker_positions)
+
+                keypoints[keypoint_name] = Keypoint(keypoint_name, keypoint_position)
                 return
 
     @staticmethod
-    def __try_hallucinate_missing_markers(marker_positions: Dict[str, np.ndarray]) -> None:
+    def __try_hallucinate_missing_markers(marker_positions: MutableMapping[str, np.ndarray]) -> None:
         """
         Try to hallucinate some of the missing markers.
 
         :param marker_positions:    The positions of the markers detected by the Vicon system.
         """
-        ViconSkeletonDetector.__try_hallucinate_trapezium_marker("LASI", marker_positions, "LPSI", "RPSI", "RASI")
-        ViconSkeletonDetector.__try_hallucinate_trapezium_marker("LPSI", marker_positions, "LASI", "RASI", "RPSI")
-        ViconSkeletonDetector.__try_hallucinate_trapezium_marker("RASI", marker_positions, "RPSI", "LPSI", "LASI")
-        ViconSkeletonDetector.__try_hallucinate_trapezium_marker("RPSI", marker_positions, "RASI", "LASI", "LPSI")
+        # The four waist markers form a single trapezium, so a marker can only be hallucinated if it is the only one
+        # of the four that is missing. If none or several of them are missing, there is nothing we can do, so early out.
+        missing_names: List[str] = [
+            name for name in ("LASI", "LPSI", "RASI", "RPSI") if marker_positions.get(name) is None
+        ]
+        if len(missing_names) != 1:
+            return
+
+        target_name: str = missing_names[0]
+        if target_name == "LASI":
+            ViconSkeletonDetector.__try_hallucinate_trapezium_marker("LASI", marker_positions, "LPSI", "RPSI", "RASI")
+        elif target_name == "LPSI":
+            ViconSkeletonDetector.__try_hallucinate_trapezium_marker("LPSI", marker_positions, "LASI", "RASI", "RPSI")
+        elif target_name == "RASI":
+            ViconSkeletonDetector.__try_hallucinate_trapezium_marker("RASI", marker_positions, "RPSI", "LPSI", "LASI")
+        else:
+            ViconSkeletonDetector.__try_hallucinate_trapezium_marker("RPSI", marker_positions, "RASI", "LASI", "LPSI")
 
     @staticmethod
-    def __try_hallucinate_trapezium_marker(target_name: str, marker_positions: Dict[str, np.ndarray],
+    def __try_hallucinate_trapezium_marker(target_name: str, marker_positions: MutableMapping[str, np.ndarray],
                                            origin_name: str, base_name: str, diagonal_name: str) -> None:
         """
         Try to hallucinate a missing marker using a trapezium approach.
@@ -264,11 +391,12 @@ class ViconSkeletonDetector:
         diagonal_pos: Optional[np.ndarray] = marker_positions.get(diagonal_name)
 
         # If the positions of the origin, base and diagonal markers are all known, but that of the target isn't:
-        if all([p is not None for p in [origin_pos, base_pos, diagonal_pos]]) \
+        if origin_pos is not None and base_pos is not None and diagonal_pos is not None \
                 and marker_positions.get(target_name) is None:
             # Calculate a position for the target and add it to the map.
             a: np.ndarray = diagonal_pos - origin_pos
             b: np.ndarray = base_pos - origin_pos
-            a_par: np.ndarray = vg.project(a, b)
+            bb: float = float(b @ b)
+            a_par: np.ndarray = (float(a @ b) / bb) * b if bb > 0.0 else np.zeros_like(a)
             a_perp: np.ndarray = a - a_par
             marker_positions[target_name] = origin_pos + b + a_perp - a_par
@@ -1,14 +1,11 @@
 import numpy as np
 
 from collections import defaultdict
-from operator import itemgetter
+from functools import lru_cache
 from typing import Dict, List, Optional, Tuple
 
 from smg.opengl import OpenGLLightingContext
-from smg.rigging.cameras import SimpleCamera
-from smg.rigging.helpers import CameraPoseConverter
 from smg.skeletons import Keypoint, Skeleton3D
-from smg.utility import GeometryUtil
 
 from .vicon_interface import ViconInterface
 
@@ -40,47 +37,79 @@ class ViconUtil:
         """
         designations: Dict[str, List[Tuple[str, float]]] = defaultdict(list)
 
-        # For each Vicon subject:
+        # Gather the right shoulder positions and upper-arm directions of all skeletons whose right shoulder and
+        # right elbow keypoints have been successfully detected by the Vicon system. Each such skeleton defines
+        # a half-ray starting at its right shoulder and directed through its right elbow.
+        skeleton_names: List[str] = []
+        ray_origins: List[np.ndarray] = []
+        ray_directions: List[np.ndarray] = []
+        for skeleton_name, skeleton in skeletons.items():
+            right_shoulder: Optional[Keypoint] = skeleton.keypoints.get("RShoulder")
+            right_elbow: Optional[Keypoint] = skeleton.keypoints.get("RElbow")
+            if right_shoulder is not None and right_elbow is not None:
+                skeleton_names.append(skeleton_name)
+                ray_origins.append(right_shoulder.position)
+                ray_directions.append(right_elbow.position - right_shoulder.position)
+
+        # If there are no such skeletons, no subject can be being designated, so early out.
+        if len(skeleton_names) == 0:
+            return designations
+
+        # Gather the positions of all designatable subjects whose positions are known.
+        subject_names: List[str] = []
+        subject_positions: List[np.ndarray] = []
         for subject_name in vicon.get_subject_names():
             # If the subject is not designatable, skip it.
             if not ViconUtil.is_designatable(subject_name):
                 continue
 
             # Try to get the subject's position. If that fails, skip the subject.
-            subject_from_world: Optional[np.ndarray] = vicon.get_segment_global_pose(subject_name, subject_name)
-            if subject_from_world is None:
+            world_from_subject: Optional[np.ndarray] = vicon.get_segment_global_pose_inverse(
+                subject_name, subject_name
+            )
+            if world_from_subject is None:
                 continue
 
-            subject_cam: SimpleCamera = CameraPoseConverter.pose_to_camera(subject_from_world)
-            subject_pos: np.ndarray = subject_cam.p()
-
-            # For each skeleton that has been detected in the current frame:
-            for skeleton_name, skeleton in skeletons.items():
-                # Try to get its right shoulder and right elbow keypoints.
-                right_shoulder: Optional[Keypoint] = skeleton.keypoints.get("RShoulder")
-                right_elbow: Optional[Keypoint] = skeleton.keypoints.get("RElbow")
-
-                # If that's possible (i.e. if they've been successfully detected by the Vicon system):
-                if right_shoulder is not None and right_elbow is not None:
-                    # Compute and record the designation distance for the current subject and skeleton.
-                    right_shoulder_pos: np.ndarray = right_shoulder.position
-                    right_elbow_pos: np.ndarray = right_elbow.position
-                    closest_point: np.ndarray = GeometryUtil.find_closest_point_on_half_ray(
-                        subject_pos, right_shoulder_pos, right_elbow_pos - right_shoulder_pos
-                    )
-                    designations[subject_name].append((skeleton_name, np.linalg.norm(subject_pos - closest_point)))
-
-            # If there any designations for the current subject, sort them in non-decreasing order of distance.
-            if designations.get(subject_name) is not None:
-                designations[subject_name] = sorted(designations[subject_name], key=itemgetter(1))
+            subject_names.append(subject_name)
+            subject_positions.append(world_from_subject[0:3, 3])
+
+        # If there are no such subjects, there's nothing that can be being designated, so early out.
+        if len(subject_names) == 0:
+            return designations
+
+        # Compute the designation distances for all (subject, skeleton) pairs in one go. For each pair, the closest
+        # point to the subject on the skeleton's half-ray is found by projecting the subject onto the ray's line and
+        # clamping the result so that it does not lie behind the ray's origin. If a skeleton's right shoulder and
+        # right elbow coincide, its half-ray degenerates to a point, so the closest point is its origin (t = 0).
+        origins: np.ndarray = np.stack(ray_origins)
+        directions: np.ndarray = np.stack(ray_directions)
+        offsets: np.ndarray = np.stack(subject_positions)[:, np.newaxis, :] - origins
+        numerators: np.ndarray = np.einsum("skj,kj->sk", offsets, directions)
+        denominators: np.ndarray = np.einsum("kj,kj->k", directions, directions)
+        ts: np.ndarray = np.zeros_like(numerators)
+        np.divide(numerators, denominators, out=ts, where=denominators > 0.0)
+        np.clip(ts, 0.0, None, out=ts)
+        distances: np.ndarray = np.linalg.norm(offsets - ts[:, :, np.newaxis] * directions, axis=2)
+
+        # Record the designations for each subject, sorted in non-decreasing order of distance.
+        for i, subject_name in enumerate(subject_names):
+            row: np.ndarray = distances[i]
+            designations[subject_name] = [
+                (skeleton_names[k], float(row[k])) for k in np.argsort(row, kind="stable")
+            ]
 
         return designations
 
     @staticmethod
+    @lru_cache(maxsize=1)
     def default_lighting_context() -> OpenGLLightingContext:
         """
         Get the default lighting context to use when rendering Vicon scenes.
 
+        .. note::
+            The context is constructed on the first call and then shared between all callers, so it should
+            not be modified.
+
         :return:    The default lighting context to use when rendering Vicon scenes.
         """
         direction: np.ndarray = np.array([0.0, 1.0, 0.0, 0.0])